@@ -1,51 +1,173 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+import time
+_process_started = time.perf_counter()
+
+from fastapi import FastAPI, File, Form, Header, UploadFile, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from trainer.utils.preprocess import preprocess_audio
-from api.model.analyzer import analyze_audio
+from api.model.analyzer import (analyze_audio, summarize_session, registry, scheduler_stats, warm_up,
+                                init_process_worker, PRELOAD_MODELS)
+from api.model.hotswap import CheckpointWatcher, reload_in_background, reload_status
+from api.model.pipeline import SpeechPipeline
+from trainer.utils.preprocess import preprocess_waveform
+from api.utils.cache import ResultCache
+from api.utils.jobs import JobStore, JobWorkers
+from api.utils.streaming import StreamingSession
+from api.utils.memory import process_memory
+from api.utils.metrics import REGISTRY as METRICS, Gauge
+from api.utils.workers import BoundedWorkerPool, PoolSaturated
 from contextlib import asynccontextmanager
 
-import shutil
+from typing import List, Optional
+
+import asyncio
+import io
+import json
 import os
-import uuid
+import signal
+import threading
+import zipfile
+
+import numpy as np
+
+# Analysis worker pool (thread or process) and its bounded queue. Process
+# workers load their own models and keep their own cache and metrics, so
+# /metrics, /cache, /models and /scheduler only cover thread mode
+WORKER_MODE = os.environ.get("ANALYZER_WORKER_MODE", "thread")
+WORKER_COUNT = int(os.environ.get("ANALYZER_WORKERS", str(min(8, os.cpu_count() or 1))))
+WORKER_QUEUE_SIZE = int(os.environ.get("ANALYZER_MAX_QUEUE", "32"))
+RETRY_AFTER_SECONDS = int(os.environ.get("ANALYZER_RETRY_AFTER", "5"))
+# Upper bounds on clips accepted by /analyze/batch and on their uncompressed size
+MAX_BATCH_FILES = int(os.environ.get("ANALYZER_MAX_BATCH_FILES", "100"))
+MAX_CLIP_BYTES = int(os.environ.get("ANALYZER_MAX_CLIP_MB", "50")) * 1024 * 1024
+MAX_BATCH_BYTES = int(os.environ.get("ANALYZER_MAX_BATCH_MB", "500")) * 1024 * 1024
+# How long a batch may wait for worker pool queue space before its remaining clips fail as busy
+BATCH_WAIT_SECONDS = float(os.environ.get("ANALYZER_BATCH_WAIT_SECONDS", "60"))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Asynchronous jobs (POST /jobs) are persisted here and run by background workers
+JOBS_DB_PATH = os.environ.get("ANALYZER_JOBS_DB", "jobs/jobs.sqlite3")
+JOB_WORKERS = int(os.environ.get("ANALYZER_JOB_WORKERS", "1"))
+AUDIO_EXTENSIONS = (".wav", ".m4a", ".webm", ".ogg", ".mp3", ".flac")
+# Hot swap of the fine-tuned checkpoint: POST /admin/reload (needs this token
+# in X-Admin-Token; disabled when unset) and/or polling of the checkpoint dir
+ADMIN_TOKEN = os.environ.get("ANALYZER_ADMIN_TOKEN") or None
+WATCH_CHECKPOINT = os.environ.get("ANALYZER_WATCH_CHECKPOINT", "0") == "1"
+WATCH_INTERVAL_SECONDS = float(os.environ.get("ANALYZER_WATCH_INTERVAL", "30"))
+# Set by api/serve.py in shared-weight workers: the parent owns the weights,
+# so it watches the checkpoint and reloads, then re-forks the workers
+FORKED_WORKER = False
+
+worker_pool = None
+job_store = None
+job_workers = None
+checkpoint_watcher = None
+# Set by the lifespan warm-up; /ready reports 503 until it has finished
+startup = {"ready": False, "error": None, "seconds": {"imports": time.perf_counter() - _process_started}}
+
+# Result cache: in-memory LRU plus optional on-disk tier (ANALYZER_CACHE_DIR)
+result_cache = ResultCache(
+    max_entries=int(os.environ.get("ANALYZER_CACHE_ENTRIES", "1024")),
+    ttl_seconds=float(os.environ.get("ANALYZER_CACHE_TTL", "3600")),
+    disk_dir=os.environ.get("ANALYZER_CACHE_DIR") or None,
+    disk_max_bytes=int(os.environ.get("ANALYZER_CACHE_DISK_MB", "256")) * 1024 * 1024,
+)
+
+# Decode -> preprocess -> analyze, passing arrays between stages
+pipeline = SpeechPipeline(base=True, cache=result_cache)
+
+def run_analysis_pipeline(data: bytes, targets: Optional[list] = None) -> dict:
+    """Decode, preprocess and analyze an upload in memory; runs on the worker pool"""
+    return pipeline(data, targets)
+
+def run_job_pipeline(data: bytes):
+    """Run a stored job through the pipeline; returns (analysis, stage seconds)"""
+    return pipeline.run_with_timings(data)
+
+def run_job(data: bytes):
+    """Job worker entry point: in process mode the job runs in a worker process, not in the parent"""
+    if WORKER_MODE == "process":
+        return worker_pool.submit(run_job_pipeline, data).result()
+    return run_job_pipeline(data)
+
+def warm_up_service():
+    """
+    Warm up preprocessing and every preloaded model, then mark the service
+    ready. In process mode the models live in the worker processes only, so
+    the parent loads nothing and is ready once every worker has warmed up.
+    """
+    seconds = startup["seconds"]
+    try:
+        start = time.perf_counter()
+        if WORKER_MODE == "process":
+            worker_pool.wait_ready()
+            seconds["warmup_workers"] = time.perf_counter() - start
+            startup["ready"] = True
+            return
+
+        dummy = (0.01 * np.random.default_rng(0).standard_normal(16000)).astype(np.float32)
+        # First call imports librosa/noisereduce and compiles their kernels
+        preprocess_waveform(dummy, 16000, pipeline.preprocessor)
+        seconds["warmup_preprocess"] = time.perf_counter() - start
+        seconds.update(warm_up(PRELOAD_MODELS))
+        startup["ready"] = True
+    except Exception as e:
+        startup["error"] = str(e)
+        print(f"Warm-up failed: {e}")
+    finally:
+        seconds["total"] = time.perf_counter() - _process_started
+        print("Startup time breakdown:")
+        for step, value in seconds.items():
+            print(f"  {step:<28} {value:7.2f}s")
+
+def transcribe_utterance(audio) -> dict:
+    """Finish preprocessing of a streamed utterance and analyze it"""
+    audio = pipeline.preprocessor.normalize_volume(audio)
+    return analyze_audio(audio, base=True)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("Starting up Speech Issues Analyzer API...")
-    temp_dir = "temp_uploads"
-    os.makedirs(temp_dir, exist_ok=True)
-    print(f"Temporary directory {temp_dir} ready.")
+    start = time.perf_counter()
+    global worker_pool
+    worker_pool = BoundedWorkerPool(max_workers=WORKER_COUNT, max_queue=WORKER_QUEUE_SIZE,
+                                    mode=WORKER_MODE, retry_after=RETRY_AFTER_SECONDS,
+                                    initializer=init_process_worker, initargs=(PRELOAD_MODELS,))
+    print(f"Worker pool ready: {WORKER_COUNT} {WORKER_MODE} workers, queue size {WORKER_QUEUE_SIZE}")
+    global job_store, job_workers
+    job_store = JobStore(JOBS_DB_PATH)
+    job_workers = JobWorkers(job_store, run_job, num_workers=JOB_WORKERS)
+    job_workers.start()
+    print(f"Job store ready at {JOBS_DB_PATH} with {JOB_WORKERS} worker(s)")
+    startup["seconds"]["workers_and_jobs"] = time.perf_counter() - start
+    # Models load and warm up in the background; the server answers /ready meanwhile
+    threading.Thread(target=warm_up_service, name="warm-up", daemon=True).start()
+    global checkpoint_watcher
+    if WATCH_CHECKPOINT and not FORKED_WORKER:
+        checkpoint_watcher = CheckpointWatcher("finetuned", poll_seconds=WATCH_INTERVAL_SECONDS)
+        checkpoint_watcher.start()
 
     yield
 
     # Shutdown
     print("Shutting down Speech Issues Analyzer API...")
-    try:
-        # Clean up temporary files
-        if os.path.exists(temp_dir):
-            # Clean individual files first to handle any locked files
-            for filename in os.listdir(temp_dir):
-                file_path = os.path.join(temp_dir, filename)
-                try:
-                    if os.path.isfile(file_path):
-                        os.remove(file_path)
-                        print(f"Removed temporary file: {filename}")
-                except Exception as e:
-                    print(f"Warning: Could not remove file {filename}: {e}")
-
-            # Remove the directory
-            try:
-                shutil.rmtree(temp_dir, ignore_errors=True)
-                print(f"Temporary directory {temp_dir} cleaned up successfully.")
-            except Exception as e:
-                print(f"Warning: Could not remove directory {temp_dir}: {e}")
-        else:
-            print(f"No temporary directory {temp_dir} to clean up.")
+    if checkpoint_watcher is not None:
+        checkpoint_watcher.stop()
+    job_workers.stop()
+    job_store.close()
+    worker_pool.shutdown()
+    registry.clear()
+    print("Shutdown completed successfully.")
 
-        print("Shutdown completed successfully.")
-    except Exception as e:
-        print(f"Error during shutdown: {e}")
+# Saturation gauges read at scrape time
+METRICS.register(Gauge("analyzer_worker_queue_depth", "Jobs waiting for a worker",
+                       lambda: worker_pool.stats()["queue_depth"]))
+METRICS.register(Gauge("analyzer_worker_utilization", "Fraction of workers currently busy",
+                       lambda: worker_pool.stats()["utilization"]))
+METRICS.register(Gauge("analyzer_cache_hit_rate", "Result cache hit rate",
+                       lambda: result_cache.stats()["hit_rate"]))
+METRICS.register(Gauge("analyzer_process_private_bytes", "Resident memory not shared with other processes",
+                       lambda: process_memory()["private_bytes"]))
 
 app = FastAPI(title="Speech Issues Analyzer API", lifespan=lifespan)
 
@@ -60,31 +182,324 @@ app.add_middleware(
 
 
 @app.post("/analyze")
-async def analyze_speech(file: UploadFile = File(...)):
+async def analyze_speech(file: UploadFile = File(...), targets: Optional[str] = Form(None)):
+    """
+    Analyze one clip. targets is an optional comma-separated word list (or
+    "*" for the game lexicon): the transcript is then restricted to one of
+    those words and the analysis includes a score for every candidate.
+    """
+    target_words = [word.strip() for word in (targets or "").split(",") if word.strip()] or None
     try:
-        # Save file temporarily
-        temp_id = str(uuid.uuid4())
-        temp_dir = "temp_uploads"
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_path = os.path.join(temp_dir, f"{temp_id}_{file.filename}")
-
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Read the spooled upload into memory; nothing is written to disk
+        data = await file.read()
 
-        # Preprocess file (optional: normalize, clean, etc.)
-        preprocessed_path = preprocess_audio(temp_path)
-
-        # Analyze file (speech-to-text + NLP)
-        result = analyze_audio(preprocessed_path, base=True)
-
-        # Clean up
-        os.remove(temp_path)
+        # Preprocessing and inference are CPU-bound: keep them off the event loop
+        try:
+            result = await worker_pool.run(run_analysis_pipeline, data, target_words)
+        except PoolSaturated as e:
+            raise HTTPException(status_code=503, detail="Server busy, please retry later",
+                                headers={"Retry-After": str(e.retry_after)})
 
         return JSONResponse(content={"success": True, "analysis": result})
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
+def _too_large(name: str, limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"{name} is too large (max {limit // (1024 * 1024)} MB)")
+
+async def _read_upload(file: UploadFile, limit: int, error: HTTPException) -> bytes:
+    """Read an upload in chunks, raising error as soon as it exceeds limit bytes"""
+    if file.size is not None and file.size > limit:
+        raise error
+    chunks = []
+    size = 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            return b"".join(chunks)
+        size += len(chunk)
+        if size > limit:
+            raise error
+        chunks.append(chunk)
+
+def _is_zip(filename: Optional[str], data: Optional[bytes]) -> bool:
+    return (data is not None and data[:4] == b"PK\x03\x04") or (filename or "").lower().endswith(".zip")
+
+async def _read_batch_uploads(files: List[UploadFile]) -> list:
+    """
+    Read the files of a batch as (filename, bytes), bounded by the batch size
+    limit and, for plain clips, the per-clip limit
+    """
+    uploads = []
+    total_bytes = 0
+    for file in files:
+        remaining = MAX_BATCH_BYTES - total_bytes
+        if _is_zip(file.filename, None) or remaining < MAX_CLIP_BYTES:
+            data = await _read_upload(file, remaining, _too_large("Batch", MAX_BATCH_BYTES))
+        else:
+            data = await _read_upload(file, MAX_CLIP_BYTES, _too_large(file.filename or "upload", MAX_CLIP_BYTES))
+        total_bytes += len(data)
+        uploads.append((file.filename, data))
+    return uploads
+
+def _expand_uploads(uploads) -> list:
+    """
+    Turn (filename, bytes) uploads into clips, unpacking zip archives in memory.
+    Entry counts and uncompressed sizes of every clip, zipped or not, are
+    checked against the limits before anything is decompressed.
+    """
+    too_many = HTTPException(status_code=413, detail=f"Too many files (max {MAX_BATCH_FILES})")
+    too_large = _too_large("Batch", MAX_BATCH_BYTES)
+    clips = []
+    total_bytes = 0
+    for filename, data in uploads:
+        if _is_zip(filename, data):
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                entries = [info for info in archive.infolist()
+                           if not info.is_dir() and info.filename.lower().endswith(AUDIO_EXTENSIONS)]
+                if len(clips) + len(entries) > MAX_BATCH_FILES:
+                    raise too_many
+                for info in entries:
+                    if info.file_size > MAX_CLIP_BYTES:
+                        raise _too_large(info.filename, MAX_CLIP_BYTES)
+                    total_bytes += info.file_size
+                if total_bytes > MAX_BATCH_BYTES:
+                    raise too_large
+                for info in sorted(entries, key=lambda i: i.filename):
+                    # Reads stop at the declared file_size, so the checks above bound memory
+                    clips.append((info.filename, archive.read(info)))
+        else:
+            if len(clips) + 1 > MAX_BATCH_FILES:
+                raise too_many
+            if len(data) > MAX_CLIP_BYTES:
+                raise _too_large(filename or "upload", MAX_CLIP_BYTES)
+            total_bytes += len(data)
+            if total_bytes > MAX_BATCH_BYTES:
+                raise too_large
+            clips.append((filename, data))
+    return clips
+
+async def _run_before(deadline: float, fn, *args):
+    """
+    Run on the worker pool, waiting for queue space until deadline (a
+    time.monotonic() value); raises PoolSaturated once it has passed
+    """
+    while True:
+        try:
+            return await worker_pool.run(fn, *args)
+        except PoolSaturated:
+            if time.monotonic() >= deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+@app.post("/analyze/batch")
+async def analyze_batch(files: List[UploadFile] = File(...)):
+    """
+    Analyze a whole session: several files and/or zip archives of clips.
+    Streams one NDJSON line per clip as it finishes, then a summary line
+    with aggregate session metrics.
+    """
+    uploads = await _read_batch_uploads(files)
+    try:
+        # Decompression is CPU-bound: keep it off the event loop
+        clips = await run_in_threadpool(_expand_uploads, uploads)
+    except zipfile.BadZipFile as e:
+        raise HTTPException(status_code=400, detail=f"Invalid zip archive: {str(e)}")
+    if not clips:
+        raise HTTPException(status_code=400, detail="No audio files found in upload")
+    if len(clips) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=413, detail=f"Too many files (max {MAX_BATCH_FILES})")
+    stats = worker_pool.stats()
+    if stats["queue_depth"] >= stats["max_queue"]:
+        raise HTTPException(status_code=503, detail="Server busy, please retry later",
+                            headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+    # Clips that cannot get a worker before the deadline fail as busy instead of waiting forever
+    deadline = time.monotonic() + BATCH_WAIT_SECONDS
+
+    async def analyze_clip(index, filename, data):
+        try:
+            analysis = await _run_before(deadline, run_analysis_pipeline, data)
+            return {"type": "clip", "index": index, "filename": filename, "success": True, "analysis": analysis}
+        except PoolSaturated as e:
+            return {"type": "clip", "index": index, "filename": filename, "success": False,
+                    "error": "Server busy, please retry later", "retry_after": e.retry_after}
+        except Exception as e:
+            return {"type": "clip", "index": index, "filename": filename, "success": False,
+                    "error": f"Error processing file: {str(e)}"}
+
+    async def stream():
+        # All clips are in flight at once so the scheduler can batch them
+        tasks = [asyncio.create_task(analyze_clip(i, name, data)) for i, (name, data) in enumerate(clips)]
+        analyses = []
+        try:
+            for done in asyncio.as_completed(tasks):
+                line = await done
+                if line["success"]:
+                    analyses.append(line["analysis"])
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+        summary = {"type": "summary", "session": summarize_session(analyses)}
+        yield json.dumps(summary, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.post("/jobs", status_code=202)
+async def create_job(file: UploadFile = File(...)):
+    """Queue a (long) recording for analysis and return its job id immediately"""
+    data = await file.read()
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty audio upload")
+    job_id = await run_in_threadpool(job_store.create, data, file.filename)
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status, queue/run timestamps, per-stage timings and the result when done"""
+    job = await run_in_threadpool(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.websocket("/ws/analyze")
+async def analyze_stream(websocket: WebSocket):
+    """
+    Streaming transcription. The client first sends a JSON config, e.g.
+    {"format": "pcm16", "sample_rate": 16000, "partial_interval": 1.0}
+    (format may also be "f32", "webm" or "ogg"), then binary audio chunks,
+    and finally {"event": "end"}. The server pushes "partial" transcripts
+    while an utterance is in progress and a "final" analysis (transcript,
+    metrics and disfluencies) as soon as the VAD detects its end.
+    """
+    await websocket.accept()
+    try:
+        config = await websocket.receive_json()
+        session = StreamingSession(
+            sample_format=config.get("format", "pcm16"),
+            sample_rate=int(config.get("sample_rate", 16000)),
+            partial_interval_s=float(config.get("partial_interval", 1.0)),
+        )
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        await websocket.send_json({"type": "error", "detail": f"Invalid stream config: {str(e)}"})
+        await websocket.close(code=1003)
+        return
+    except WebSocketDisconnect:
+        return
+
+    utterance_index = 0
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            final = False
+            data = message.get("bytes")
+            if data is None:
+                try:
+                    event = json.loads(message.get("text") or "{}")
+                except ValueError:
+                    event = {}
+                if event.get("event") != "end":
+                    continue
+                final = True
+                data = b""
+
+            utterances, partial = await run_in_threadpool(session.feed, data, final)
+            try:
+                if partial is not None and not utterances:
+                    result = await worker_pool.run(analyze_audio, partial, True)
+                    await websocket.send_json({"type": "partial", "utterance": utterance_index,
+                                               "transcript": result["transcript"]})
+                for utterance in utterances:
+                    result = await worker_pool.run(transcribe_utterance, utterance)
+                    await websocket.send_json({"type": "final", "utterance": utterance_index, "analysis": result})
+                    utterance_index += 1
+            except PoolSaturated as e:
+                await websocket.send_json({"type": "error", "detail": "Server busy, please retry later",
+                                           "retry_after": e.retry_after})
+
+            if final:
+                await websocket.send_json({"type": "end", "utterances": utterance_index})
+                await websocket.close()
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await run_in_threadpool(session.close)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of pipeline latency, audio duration and RTF"""
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/workers")
+async def workers():
+    return worker_pool.stats()
+
+@app.get("/cache")
+async def cache():
+    return result_cache.stats()
+
+@app.get("/models")
+async def models():
+    return registry.stats()
+
+@app.get("/memory")
+async def memory():
+    """Shared vs private resident memory of this worker process (see api/serve.py)"""
+    return process_memory()
+
+@app.get("/scheduler")
+async def scheduler():
+    return {"schedulers": scheduler_stats()}
+
+def _check_admin(token: Optional[str]):
+    if ADMIN_TOKEN is None:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (set ANALYZER_ADMIN_TOKEN)")
+    if token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@app.post("/admin/reload", status_code=202)
+async def reload_checkpoint(model: str = "finetuned", source: Optional[str] = None,
+                            x_admin_token: Optional[str] = Header(None)):
+    """
+    Load a new checkpoint for a variant in the background, warm it up and
+    swap it in without downtime; poll GET /admin/reload for the outcome.
+    source defaults to the variant's configured path (e.g. a re-trained
+    outputs/whisper-finetuned copied over the old one).
+    Shared-weight workers pass the request on to the parent process, which
+    reloads its configured checkpoints and restarts the workers on the new
+    weights; the outcome is then in the parent's log.
+    """
+    _check_admin(x_admin_token)
+    if model not in registry.variants:
+        raise HTTPException(status_code=404, detail=f"Unknown model variant: {model}")
+    if FORKED_WORKER:
+        if model != "finetuned" or source is not None:
+            raise HTTPException(status_code=400, detail="Shared-weight workers only reload the configured "
+                                                        "fine-tuned checkpoint")
+        os.kill(os.getppid(), signal.SIGHUP)
+        return {"model": model, "status": "loading", "handled_by": "parent"}
+    if not reload_in_background(model, source):
+        raise HTTPException(status_code=409, detail="A reload is already in progress")
+    return {"model": model, "status": "loading"}
+
+@app.get("/admin/reload")
+async def reload_state(x_admin_token: Optional[str] = Header(None)):
+    _check_admin(x_admin_token)
+    return reload_status
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once every preloaded model has been warmed up, else 503"""
+    status_code = 200 if startup["ready"] else 503
+    return JSONResponse(status_code=status_code, content=startup)
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Speech Issues Analyzer API. Use /analyze to upload audio files."}
@@ -1,23 +1,84 @@
 import os
-import torch
-import librosa
+import threading
+import time
 import re
-from transformers import WhisperProcessor, WhisperForConditionalGeneration
+import numpy as np
+from typing import Union, Optional
+from api.model.registry import ModelRegistry
+from api.model.backends import is_torch_model
+from api.model.scheduler import BatchScheduler
+from api.model.longform import transcribe_long, WINDOW_SECONDS
+from api.model import decoding
+from api.model.decoding import GREEDY_KWARGS, resolve_fallbacks
+from api.model import short_input
+from api.model import lexicon
+from api.model.speculative import assisted_generate
+from api.utils.metrics import stage_timer, RETRY_SECONDS, SPECULATIVE_ACCEPTANCE
+from trainer.utils.features import log_mel_features
 
 # Cache model and processor
-MODEL_PATH = os.path.join(os.path.dirname(__file__), '.\whisper-finetuned')
-_model = None
-_processor = None
-_device = None
-
-def _load_model():
-    global _model, _processor, _device
-    if _model is None or _processor is None or _device is None:
-        _processor = WhisperProcessor.from_pretrained(MODEL_PATH)
-        _model = WhisperForConditionalGeneration.from_pretrained(MODEL_PATH)
-        _device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        _model = _model.to(_device)
-    return _model, _processor, _device
+MODEL_PATH = os.environ.get("ANALYZER_MODEL_PATH",
+                            os.path.join(os.path.dirname(__file__), 'whisper-finetuned'))
+BASE_MODEL_NAME = "openai/whisper-medium"
+
+
+def _parse_variants(spec: str) -> dict:
+    """Parse "name=source,name=source" into a dict"""
+    variants = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, source = item.split("=", 1)
+            variants[name.strip()] = source.strip()
+    return variants
+
+
+# Model variants served by the registry. Extra (e.g. smaller) models can be
+# added with ANALYZER_EXTRA_MODELS="tiny=openai/whisper-tiny,small=openai/whisper-small"
+MODEL_VARIANTS = {
+    "finetuned": MODEL_PATH,
+    "base": BASE_MODEL_NAME,
+    **_parse_variants(os.environ.get("ANALYZER_EXTRA_MODELS", "")),
+}
+# Variants loaded from the FastAPI lifespan hook
+PRELOAD_MODELS = [name.strip() for name in
+                  os.environ.get("ANALYZER_PRELOAD_MODELS", "base").split(",") if name.strip()]
+# Combined model memory budget in MB (0 = unlimited)
+MODEL_MEMORY_BUDGET_MB = int(os.environ.get("ANALYZER_MODEL_MEMORY_BUDGET_MB", "0"))
+
+# Micro-batching of concurrent requests
+MAX_BATCH_SIZE = int(os.environ.get("ANALYZER_MAX_BATCH_SIZE", "8"))
+MAX_BATCH_WAIT_MS = float(os.environ.get("ANALYZER_MAX_BATCH_WAIT_MS", "10"))
+# Overlap between long-form windows that cannot be cut at silence
+LONG_FORM_OVERLAP_SECONDS = float(os.environ.get("ANALYZER_LONG_FORM_OVERLAP", "2"))
+
+# Fallback decodes for empty greedy transcripts, tried in order; see
+# decoding.FALLBACK_STRATEGIES (default, beam, min_length, temperature)
+FALLBACK_STRATEGY_NAMES = [name.strip() for name in
+                           os.environ.get("ANALYZER_FALLBACK", "default").split(",") if name.strip()]
+FALLBACK_STEPS = resolve_fallbacks(FALLBACK_STRATEGY_NAMES)
+# Optional small variant (e.g. "tiny" from ANALYZER_EXTRA_MODELS) that drafts
+# tokens for speculative decoding; output stays identical to greedy decoding
+ASSISTANT_MODEL = os.environ.get("ANALYZER_ASSISTANT_MODEL") or None
+# Short-input mode: encode only the mel frames the clip needs (rounded up to
+# a bucket) instead of 30 s of padding. Enabled per variant, e.g.
+# ANALYZER_SHORT_INPUT_MODELS="finetuned", and only honoured for checkpoints
+# written by trainer/short_input_finetune.py (which record their bucket size)
+SHORT_INPUT_MODELS = {name.strip() for name in
+                      os.environ.get("ANALYZER_SHORT_INPUT_MODELS", "").split(",") if name.strip()}
+# Word-naming game: target words for lexicon-constrained decoding are read
+# from the recording file names under this folder (targets=["*"])
+LEXICON_DIR = os.environ.get("ANALYZER_LEXICON_DIR", "data")
+
+# Inference backend: fp32, int8 (dynamic quantization, CPU) or bf16
+INFERENCE_BACKEND = os.environ.get("ANALYZER_BACKEND", "fp32")
+
+registry = ModelRegistry(MODEL_VARIANTS, memory_budget_bytes=MODEL_MEMORY_BUDGET_MB * 1024 * 1024,
+                         backend=INFERENCE_BACKEND)
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+# Cleared in process-pool workers, which transcribe their own request directly
+_use_scheduler = True
+
 
 def find_disfluencies(text: str):
     """
@@ -59,58 +120,270 @@ def find_disfluencies(text: str):
         found += re.findall(pattern, text, flags=re.IGNORECASE)
     return found
 
-def analyze_audio(file_path: str, base: bool = False) -> dict:
+def _greedy_assisted(handle, assistant, inputs) -> list:
+    """Greedy pass with speculative decoding, one clip at a time"""
+    generated = []
+    for i in range(inputs.input_features.shape[0]):
+        ids, stats = assisted_generate(
+            handle.model,
+            assistant.model,
+            inputs.input_features[i:i + 1],
+            inputs.attention_mask[i:i + 1],
+            **GREEDY_KWARGS,
+        )
+        SPECULATIVE_ACCEPTANCE.observe(stats["acceptance_rate"])
+        generated.extend(handle.processor.batch_decode(ids, skip_special_tokens=True))
+    return generated
+
+
+def _encode(handle, input_features, audios):
+    """Encoder pass, on bucketed short inputs when the variant has short-input mode on"""
+    model = handle.model
+    if handle.name in SHORT_INPUT_MODELS and is_torch_model(model):
+        bucket = short_input.trained_bucket_frames(model)
+        if bucket is not None:
+            frames = short_input.bucket_frames(max(len(a) for a in audios), bucket)
+            if frames < short_input.FULL_FRAMES:
+                return short_input.encode_short(model, input_features, frames)
+    return decoding.encode(model, input_features)
+
+
+def transcribe_batch(audios, model_name: str = "finetuned", assistant_name: Optional[str] = None) -> list:
+    """
+    Transcribe a list of 16 kHz waveforms with a single padded generate call.
+    The encoder runs once per batch; clips that come back empty are retried
+    with the configured fallback strategies on the same encoder outputs.
+    If assistant_name is given, the greedy pass uses speculative decoding
+    with that variant as the draft model.
+    """
+    assistant_name = assistant_name or ASSISTANT_MODEL
+    with registry.lease(model_name) as handle:
+        model, processor, device = handle.model, handle.processor, handle.device
+        with stage_timer("feature_extraction"):
+            inputs = log_mel_features(processor, audios, device).to(device)
+            inputs["input_features"] = inputs.input_features.to(handle.dtype)
+
+        encoder_outputs = None
+        start = time.perf_counter()
+        if assistant_name and is_torch_model(model) and assistant_name != model_name:
+            with registry.lease(assistant_name) as assistant, stage_timer("generate"):
+                decoded = _greedy_assisted(handle, assistant, inputs)
+        else:
+            with stage_timer("encode"):
+                encoder_outputs = _encode(handle, inputs.input_features, audios)
+            with stage_timer("generate"):
+                generated_ids = decoding.generate(model, inputs.input_features, inputs.attention_mask,
+                                                  encoder_outputs, **GREEDY_KWARGS)
+            decoded = processor.batch_decode(generated_ids, skip_special_tokens=True)
+        greedy_seconds = time.perf_counter() - start
+        transcriptions = [t.strip() for t in decoded]
+
+        retry_seconds = 0.0
+        for strategy, kwargs in FALLBACK_STEPS:
+            empty = [i for i, t in enumerate(transcriptions) if not t]
+            if not empty:
+                break
+            start = time.perf_counter()
+            with stage_timer("generate_retry"):
+                if encoder_outputs is None:
+                    encoder_outputs = _encode(handle, inputs.input_features, audios)
+                generated_ids = decoding.generate(model, inputs.input_features, inputs.attention_mask,
+                                                  encoder_outputs, indices=empty, **kwargs)
+            elapsed = time.perf_counter() - start
+            RETRY_SECONDS.observe(elapsed, strategy=strategy)
+            retry_seconds += elapsed
+            retried = processor.batch_decode(generated_ids, skip_special_tokens=True)
+            for i, text in zip(empty, retried):
+                transcriptions[i] = text.strip()
+        if retry_seconds:
+            print(f"Fallback decoding added {1000 * retry_seconds:.0f} ms "
+                  f"({100 * retry_seconds / max(greedy_seconds, 1e-9):.0f}% of the greedy pass)")
+        return transcriptions
+
+
+def recognize_word(audio: np.ndarray, targets, model_name: str = "finetuned") -> dict:
+    """
+    Recognize which target word a clip names, decoding only along the
+    lexicon's token trie. targets=["*"] uses the words found in LEXICON_DIR.
+    """
+    words = lexicon.load_lexicon(LEXICON_DIR) if list(targets) == ["*"] else targets
+    with registry.lease(model_name) as handle:
+        model, processor, device = handle.model, handle.processor, handle.device
+        if not is_torch_model(model):
+            raise ValueError("Lexicon-constrained decoding needs a PyTorch backend")
+        with stage_timer("feature_extraction"):
+            inputs = log_mel_features(processor, [audio], device)
+            input_features = inputs.input_features.to(handle.dtype)
+        with stage_timer("encode"):
+            encoder_outputs = _encode(handle, input_features, [audio])
+        with stage_timer("generate"):
+            return lexicon.constrained_transcribe(model, processor, encoder_outputs, words)
+
+
+def _dummy_clip() -> np.ndarray:
+    """One second of quiet noise used to warm up models"""
+    return (0.01 * np.random.default_rng(0).standard_normal(16000)).astype(np.float32)
+
+
+def warm_up_handle(handle):
+    """Run a dummy clip through a loaded handle; raises if the model cannot decode"""
+    inputs = log_mel_features(handle.processor, [_dummy_clip()], handle.device).to(handle.device)
+    input_features = inputs.input_features.to(handle.dtype)
+    encoder_outputs = decoding.encode(handle.model, input_features)
+    generated_ids = decoding.generate(handle.model, input_features, inputs.attention_mask, encoder_outputs,
+                                      max_new_tokens=8, **GREEDY_KWARGS)
+    if generated_ids.shape[-1] == 0:
+        raise RuntimeError("Warm-up generate returned no tokens")
+    handle.processor.batch_decode(generated_ids, skip_special_tokens=True)
+
+
+def warm_up(model_names) -> dict:
+    """
+    Load each variant and run a short dummy clip through it, so the first
+    request does not pay for lazy initialization (kernels, allocator, caches).
+
+    Returns:
+        Dict of seconds per step: load_<name> and warmup_<name>
+    """
+    timings = {}
+    dummy = _dummy_clip()
+    for name in model_names:
+        start = time.perf_counter()
+        registry.get(name)
+        timings[f"load_{name}"] = time.perf_counter() - start
+        start = time.perf_counter()
+        transcribe_batch([dummy], name)
+        timings[f"warmup_{name}"] = time.perf_counter() - start
+    return timings
+
+
+def get_scheduler(model_name: str = "finetuned") -> BatchScheduler:
+    """Return the micro-batching scheduler for a model variant"""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(model_name)
+        if scheduler is None:
+            scheduler = BatchScheduler(
+                lambda audios: transcribe_batch(audios, model_name),
+                max_batch_size=MAX_BATCH_SIZE,
+                max_wait_ms=MAX_BATCH_WAIT_MS,
+                name=model_name,
+            )
+            _schedulers[model_name] = scheduler
+        return scheduler
+
+
+def init_process_worker(preload=()):
+    """
+    Initializer for process-pool workers: load and warm up the preloaded
+    variants in this process and transcribe without a scheduler. Each worker
+    only ever holds one request, so there is nothing to batch, and no
+    batching threads are started.
+    """
+    global _use_scheduler
+    _use_scheduler = False
+    timings = warm_up(preload)
+    print(f"Worker {os.getpid()} ready: " + ", ".join(f"{step} {seconds:.1f}s" for step, seconds in timings.items()))
+
+
+def scheduler_stats() -> list:
+    with _schedulers_lock:
+        return [scheduler.stats() for scheduler in _schedulers.values()]
+
+
+def model_settings(model_name: str = "finetuned") -> dict:
+    """Everything about the model side that changes a transcription (used for cache keys)"""
+    return {
+        "model": model_name,
+        "source": registry.variants.get(model_name),
+        "version": registry.version(model_name),
+        "backend": INFERENCE_BACKEND,
+        "short_input": model_name in SHORT_INPUT_MODELS,
+        "generate": GREEDY_KWARGS,
+        "fallback": FALLBACK_STEPS,
+    }
+
+
+def build_analysis(transcription: str) -> dict:
+    """Compute simple metrics for a transcript"""
+    words = transcription.split()
+    word_count = len(words)
+    unique_words = set(words)
+    lexical_richness = len(unique_words) / word_count if word_count > 0 else 0
+    # Regex-based disfluency detection
+    with stage_timer("find_disfluencies"):
+        disfluencies = find_disfluencies(transcription)
+    return {
+        "transcript": transcription,
+        "metrics": {
+            "word_count": word_count,
+            "lexical_richness": lexical_richness,
+            "disfluencies": disfluencies,
+        },
+        "recommendation": "Evaluar con especialista si persiste el retraso en el habla."
+    }
+
+
+def summarize_session(analyses: list) -> dict:
+    """Aggregate metrics over the analyses of a whole session"""
+    transcripts = [a.get("transcript", "") for a in analyses if a.get("transcript")]
+    words = " ".join(transcripts).split()
+    word_count = len(words)
+    disfluency_counts = {}
+    for analysis in analyses:
+        for disfluency in analysis.get("metrics", {}).get("disfluencies", []):
+            key = disfluency.lower()
+            disfluency_counts[key] = disfluency_counts.get(key, 0) + 1
+    return {
+        "clips": len(analyses),
+        "transcribed_clips": len(transcripts),
+        "word_count": word_count,
+        "lexical_richness": len(set(words)) / word_count if word_count > 0 else 0,
+        "disfluency_total": sum(disfluency_counts.values()),
+        "disfluencies": disfluency_counts,
+    }
+
+
+def analyze_audio(file_path: Union[str, np.ndarray], base: bool = False, long_form: Optional[bool] = None,
+                  targets: Optional[list] = None) -> dict:
     """
     Transcribe audio using fine-tuned Whisper or base Whisper (if base=True) and return transcript and simple metrics.
+    file_path may also be a 16 kHz float32 waveform that was decoded in memory.
+    Concurrent calls are grouped into batches by the model's scheduler.
+    Recordings longer than 30 seconds (or long_form=True) are split into
+    windows and stitched back together, with segment timestamps in the result.
+    With targets (a word list, or ["*"] for the game lexicon) the transcript
+    is restricted to one of those words and every candidate gets a score.
     """
-    if base:
-        model_name = "openai/whisper-medium"  # or "openai/whisper-base" for a smaller model
-        processor = WhisperProcessor.from_pretrained(model_name)
-        model = WhisperForConditionalGeneration.from_pretrained(model_name)
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        model = model.to(device)
-    else:
-        model, processor, device = _load_model()
+    model_name = "base" if base else "finetuned"
     try:
-        audio, sr = librosa.load(file_path, sr=16000)
-        inputs = processor(audio, sampling_rate=16000, return_tensors="pt", return_attention_mask=True)
-        inputs = inputs.to(device)
-        with torch.no_grad():
-            generated_ids = model.generate(
-                inputs.input_features,
-                attention_mask=inputs.attention_mask,
-                do_sample=False,
-                num_beams=1,
-                language="es",
-                task="transcribe",
+        if isinstance(file_path, np.ndarray):
+            audio = file_path.astype(np.float32, copy=False)
+        else:
+            import librosa
+            audio, sr = librosa.load(file_path, sr=16000)
+        if targets:
+            recognition = recognize_word(audio, targets, model_name)
+            result = build_analysis(recognition["word"])
+            result["candidates"] = recognition["candidates"]
+            return result
+        if long_form is None:
+            long_form = len(audio) > WINDOW_SECONDS * 16000
+        if long_form:
+            transcription, segments = transcribe_long(
+                audio,
+                lambda windows: transcribe_batch(windows, model_name),
+                batch_size=MAX_BATCH_SIZE,
+                overlap_s=LONG_FORM_OVERLAP_SECONDS,
             )
-        transcription = processor.batch_decode(generated_ids, skip_special_tokens=True)[0].strip()
-        if not transcription:
-            with torch.no_grad():
-                generated_ids = model.generate(
-                    inputs.input_features,
-                    attention_mask=inputs.attention_mask,
-                    language="es",
-                    task="transcribe",
-                )
-                transcription = processor.batch_decode(generated_ids, skip_special_tokens=True)[0].strip()
-        # Simple metrics
+            result = build_analysis(transcription)
+            result["segments"] = segments
+            return result
+        if _use_scheduler:
+            transcription = get_scheduler(model_name)(audio)
+        else:
+            transcription = transcribe_batch([audio], model_name)[0]
         print(transcription)
-        words = transcription.split()
-        word_count = len(words)
-        unique_words = set(words)
-        lexical_richness = len(unique_words) / word_count if word_count > 0 else 0
-        # Regex-based disfluency detection
-        disfluencies = find_disfluencies(transcription)
-        return {
-            "transcript": transcription,
-            "metrics": {
-                "word_count": word_count,
-                "lexical_richness": lexical_richness,
-                "disfluencies": disfluencies,
-            },
-            "recommendation": "Evaluar con especialista si persiste el retraso en el habla."
-        }
+        return build_analysis(transcription)
     except Exception as e:
         return {
             "transcript": "",
@@ -0,0 +1,164 @@
+import hashlib
+import importlib.util
+import os
+import sys
+import time
+from typing import TYPE_CHECKING
+
+# torch, transformers and optimum are imported when a model is loaded
+if TYPE_CHECKING:
+    import torch
+ONNX_AVAILABLE = importlib.util.find_spec("optimum") is not None and \
+    importlib.util.find_spec("onnxruntime") is not None
+
+# fp32: stock PyTorch weights
+# int8: dynamic int8 quantization of the nn.Linear layers (CPU)
+# bf16: bfloat16 weights, only where the CPU supports it natively
+# onnx: exported encoder + KV-cached decoder graphs on ONNX Runtime (CPU)
+BACKENDS = ("fp32", "int8", "bf16", "onnx")
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), "quantized")
+
+
+def is_torch_model(model) -> bool:
+    """Whether model is a PyTorch module, without importing torch for other backends"""
+    torch = sys.modules.get("torch")
+    return torch is not None and isinstance(model, torch.nn.Module)
+
+
+def bf16_supported() -> bool:
+    """Whether this CPU has native bf16 kernels (AVX512-BF16 / AMX)"""
+    import torch
+    checks = (
+        lambda: torch.ops.mkldnn._is_mkldnn_bf16_supported(),
+        lambda: torch.backends.mkldnn.is_available() and torch.cpu._is_avx512_bf16_supported(),
+    )
+    for check in checks:
+        try:
+            return bool(check())
+        except (AttributeError, RuntimeError):
+            continue
+    return False
+
+
+def checkpoint_mtime(source: str) -> float:
+    """Latest modification time of a local checkpoint directory (0 for hub ids)"""
+    if not os.path.isdir(source):
+        return 0.0
+    mtimes = [os.path.getmtime(os.path.join(source, f)) for f in sorted(os.listdir(source))]
+    return max(mtimes) if mtimes else 0.0
+
+
+def _artifact_path(source: str, backend: str, cache_dir: str) -> str:
+    """Cache file name tied to the checkpoint (and its mtime) and the torch version"""
+    import torch
+    stamp = source
+    if os.path.isdir(source):
+        stamp += str(checkpoint_mtime(source))
+    digest = hashlib.sha1(f"{stamp}|{torch.__version__}".encode("utf-8")).hexdigest()[:12]
+    name = os.path.basename(os.path.normpath(source)).replace("/", "_")
+    return os.path.join(cache_dir, f"{name}-{backend}-{digest}.pt")
+
+
+def onnx_dir_for(source: str) -> str:
+    """Where the ONNX export of a checkpoint lives (see trainer/export_onnx.py)"""
+    if os.path.isdir(source):
+        return f"{os.path.normpath(source)}-onnx"
+    # Hub model ids, e.g. openai/whisper-medium -> onnx/openai--whisper-medium
+    return os.path.join(os.path.dirname(__file__), "onnx", source.replace("/", "--"))
+
+
+def load_onnx(source: str, onnx_dir: str = None):
+    """Load an exported model on ONNX Runtime's CPU provider with the KV-cached decoder"""
+    if not ONNX_AVAILABLE:
+        raise RuntimeError("The onnx backend needs optimum[onnxruntime]: pip install optimum[onnxruntime]")
+    from optimum.onnxruntime import ORTModelForSpeechSeq2Seq
+    onnx_dir = onnx_dir or onnx_dir_for(source)
+    if not os.path.isdir(onnx_dir):
+        raise FileNotFoundError(f"No ONNX export at {onnx_dir}; run: python trainer/export_onnx.py {source} {onnx_dir}")
+    return ORTModelForSpeechSeq2Seq.from_pretrained(onnx_dir, provider="CPUExecutionProvider", use_cache=True)
+
+
+def quantize_int8(model):
+    """Dynamic int8 quantization of all linear layers"""
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _from_pretrained(source: str, torch_dtype=None):
+    """
+    Load a checkpoint without materializing a randomly initialized model
+    first; safetensors checkpoints are memory-mapped while loading
+    """
+    from transformers import WhisperForConditionalGeneration
+    return WhisperForConditionalGeneration.from_pretrained(source, torch_dtype=torch_dtype, low_cpu_mem_usage=True)
+
+
+def load_whisper(source: str, backend: str = "fp32", cache_dir: str = DEFAULT_CACHE_DIR):
+    """
+    Load a Whisper model and processor for the given inference backend
+
+    Quantized models are pickled to cache_dir the first time, so later
+    startups load the int8 weights directly instead of re-quantizing.
+
+    Returns:
+        Tuple of (model, processor, device, backend actually used)
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+    import torch
+    from transformers import WhisperProcessor
+    processor = WhisperProcessor.from_pretrained(source)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    if backend == "int8" and device.type != "cpu":
+        print("Warning: int8 dynamic quantization is CPU-only, using fp32")
+        backend = "fp32"
+    if backend == "bf16" and device.type == "cpu" and not bf16_supported():
+        print("Warning: CPU has no native bf16 support, using fp32")
+        backend = "fp32"
+
+    if backend == "onnx":
+        start = time.perf_counter()
+        model = load_onnx(source)
+        print(f"Loaded ONNX Runtime model for {source} in {time.perf_counter() - start:.1f}s")
+        return model, processor, torch.device("cpu"), backend
+
+    if backend == "int8":
+        path = _artifact_path(source, backend, cache_dir)
+        if os.path.exists(path):
+            start = time.perf_counter()
+            model = torch.load(path, weights_only=False, mmap=True)
+            print(f"Loaded cached int8 model from {path} in {time.perf_counter() - start:.1f}s")
+        else:
+            model = _from_pretrained(source)
+            model.eval()
+            start = time.perf_counter()
+            model = quantize_int8(model)
+            print(f"Quantized {source} to int8 in {time.perf_counter() - start:.1f}s")
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                torch.save(model, tmp_path)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Warning: could not cache quantized model: {e}")
+    else:
+        # bf16 weights are loaded as bf16 directly, without an fp32 copy first
+        model = _from_pretrained(source, torch.bfloat16 if backend == "bf16" else None)
+
+    model = model.to(device)
+    model.eval()
+    return model, processor, device, backend
+
+
+def model_dtype(model) -> "torch.dtype":
+    """Floating point dtype the model expects for input_features"""
+    import torch
+    if not hasattr(model, "parameters"):
+        # ONNX Runtime models take fp32 inputs
+        return torch.float32
+    for param in model.parameters():
+        if param.is_floating_point():
+            return param.dtype
+    return torch.float32
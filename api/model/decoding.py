@@ -0,0 +1,59 @@
+from api.model.backends import is_torch_model
+
+# Greedy decoding used for the first pass of every transcription
+GREEDY_KWARGS = {"do_sample": False, "num_beams": 1, "language": "es", "task": "transcribe"}
+
+# Decodes tried, in order, for clips whose greedy transcript is empty.
+# Each strategy is a list of generate kwargs (applied on top of language/task).
+FALLBACK_STRATEGIES = {
+    # The model's own generation_config defaults (previous behaviour)
+    "default": [{}],
+    # Wider search
+    "beam": [{"num_beams": 5, "do_sample": False}],
+    # Forbid ending right after the prompt
+    "min_length": [{"num_beams": 1, "do_sample": False, "min_new_tokens": 2}],
+    # Whisper-style temperature fallback
+    "temperature": [{"num_beams": 1, "do_sample": True, "temperature": t} for t in (0.2, 0.4, 0.6, 0.8)],
+}
+
+
+def resolve_fallbacks(names) -> list:
+    """Expand strategy names into a list of (name, generate kwargs)"""
+    steps = []
+    for name in names:
+        if name not in FALLBACK_STRATEGIES:
+            raise ValueError(f"Unknown fallback strategy: {name}")
+        for kwargs in FALLBACK_STRATEGIES[name]:
+            steps.append((name, {"language": "es", "task": "transcribe", **kwargs}))
+    return steps
+
+
+def encode(model, input_features):
+    """
+    Run the encoder once so every decode of the clip can reuse its hidden
+    states. Returns None for models without a separate PyTorch encoder.
+    """
+    if not is_torch_model(model) or not hasattr(model, "get_encoder"):
+        return None
+    import torch
+    with torch.no_grad():
+        return model.get_encoder()(input_features, return_dict=True)
+
+
+def generate(model, input_features, attention_mask=None, encoder_outputs=None, indices=None, **kwargs):
+    """
+    model.generate on precomputed encoder outputs when available, otherwise
+    on the input features. indices restricts the call to part of the batch.
+    """
+    import torch
+    from transformers.modeling_outputs import BaseModelOutput
+    with torch.no_grad():
+        if encoder_outputs is not None:
+            # Always pass a fresh wrapper: generate expands it in place for beams
+            hidden = encoder_outputs.last_hidden_state
+            encoder_outputs = BaseModelOutput(last_hidden_state=hidden if indices is None else hidden[indices])
+            return model.generate(encoder_outputs=encoder_outputs, **kwargs)
+        if indices is not None:
+            input_features = input_features[indices]
+            attention_mask = attention_mask[indices] if attention_mask is not None else None
+        return model.generate(input_features, attention_mask=attention_mask, **kwargs)
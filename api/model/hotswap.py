@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+
+from api.model.analyzer import registry, warm_up_handle
+from api.model.backends import checkpoint_mtime
+
+_reload_lock = threading.Lock()
+# Last reload per variant: state (loading, swapped, failed), source, error, seconds
+reload_status = {}
+
+
+def reload_model(name: str = "finetuned", source: str = None, warm_up_fn=warm_up_handle) -> dict:
+    """
+    Load, warm up and hot-swap a variant (see ModelRegistry.swap). Only one
+    reload runs at a time; a failed reload leaves the current model serving.
+    warm_up_fn is called with the new handle and raises to abort the swap.
+
+    Returns:
+        The variant's reload status
+    """
+    with _reload_lock:
+        source = source or registry.variants[name]
+        status = {"state": "loading", "source": source, "error": None, "started_at": time.time()}
+        reload_status[name] = status
+        start = time.perf_counter()
+        try:
+            registry.swap(name, source, warm_up_fn=warm_up_fn)
+            status["state"] = "swapped"
+            status["version"] = registry.version(name)
+        except Exception as e:
+            status["state"] = "failed"
+            status["error"] = str(e)
+            print(f"Reload of '{name}' from {source} failed, keeping the current model: {e}")
+        status["seconds"] = time.perf_counter() - start
+        return status
+
+
+def reload_in_background(name: str = "finetuned", source: str = None, warm_up_fn=warm_up_handle) -> bool:
+    """Start reload_model on a thread; False if a reload is already running"""
+    if _reload_lock.locked():
+        return False
+    threading.Thread(target=reload_model, args=(name, source, warm_up_fn), name=f"reload-{name}",
+                     daemon=True).start()
+    return True
+
+
+def reload_in_progress() -> bool:
+    return _reload_lock.locked()
+
+
+class CheckpointWatcher:
+    """
+    Polls a checkpoint directory and hot-swaps the variant when it changes.
+    A change is only picked up once the files have stopped changing for one
+    poll, so a checkpoint that is still being written is not loaded.
+    """
+
+    def __init__(self, name: str = "finetuned", path: str = None, poll_seconds: float = 30.0,
+                 warm_up_fn=warm_up_handle):
+        self.name = name
+        self.path = path or registry.variants[name]
+        self.poll_seconds = poll_seconds
+        self.warm_up_fn = warm_up_fn
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if not os.path.isdir(self.path):
+            print(f"Warning: not watching {self.path}: not a checkpoint directory")
+            return
+        self._thread = threading.Thread(target=self._loop, name=f"watch-{self.name}", daemon=True)
+        self._thread.start()
+        print(f"Watching {self.path} for new '{self.name}' checkpoints every {self.poll_seconds:.0f}s")
+
+    def _loop(self):
+        loaded = checkpoint_mtime(self.path)
+        pending = None
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                mtime = checkpoint_mtime(self.path)
+            except OSError:
+                continue
+            if mtime == loaded:
+                pending = None
+            elif mtime != pending:
+                pending = mtime
+            else:
+                print(f"New checkpoint detected in {self.path}")
+                reload_model(self.name, self.path, self.warm_up_fn)
+                loaded, pending = mtime, None
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
@@ -0,0 +1,193 @@
+import functools
+import os
+import string
+
+from api.model import decoding
+from api.model.backends import is_torch_model
+from api.model.decoding import GREEDY_KWARGS
+
+# Teacher-forced candidate scoring runs this many candidates per forward pass
+SCORE_CHUNK_SIZE = 64
+
+
+def normalize_word(text: str) -> str:
+    """Lowercase and strip surrounding whitespace and punctuation"""
+    return text.strip().strip(string.punctuation + "¡¿").strip().lower()
+
+
+@functools.lru_cache(maxsize=8)
+def load_lexicon(root_folder: str = "data") -> tuple:
+    """
+    Target words of the word-naming game, taken from the recording file names
+    (<pronunciation>-<real word>-<label>.wav, see trainer/data_taker.py)
+    """
+    words = set()
+    if not os.path.isdir(root_folder):
+        return ()
+    for subfolder in os.listdir(root_folder):
+        subfolder_path = os.path.join(root_folder, subfolder, "respuestas")
+        if not os.path.isdir(subfolder_path):
+            continue
+        for filename in os.listdir(subfolder_path):
+            if filename.endswith('.wav'):
+                parts = filename[:-4].split('-')
+                if len(parts) >= 3 and parts[1].strip():
+                    words.add(normalize_word(parts[1]))
+    return tuple(sorted(words))
+
+
+class _Node:
+    __slots__ = ("children", "word")
+
+    def __init__(self):
+        self.children = {}
+        self.word = None
+
+
+class TokenTrie:
+    """Prefix trie over the token sequences of a word list"""
+
+    def __init__(self, tokenizer, words):
+        self.root = _Node()
+        self.sequences = []
+        self.depth = 0
+        for word in words:
+            # Whisper may emit the word with or without a leading space and capitalized
+            variants = {word, word.capitalize(), f" {word}", f" {word.capitalize()}"}
+            for variant in sorted(variants):
+                ids = tokenizer.encode(variant, add_special_tokens=False)
+                if ids:
+                    self._insert(ids, word)
+
+    def _insert(self, ids, word):
+        node = self.root
+        for token in ids:
+            node = node.children.setdefault(token, _Node())
+        if node.word is None:
+            node.word = word
+            self.sequences.append((word, list(ids)))
+            self.depth = max(self.depth, len(ids))
+
+    def node(self, ids):
+        """Node reached by following ids from the root, or None if off the trie"""
+        node = self.root
+        for token in ids:
+            node = node.children.get(token)
+            if node is None:
+                return None
+        return node
+
+
+@functools.lru_cache(maxsize=32)
+def _build_trie(tokenizer, words: tuple) -> TokenTrie:
+    return TokenTrie(tokenizer, words)
+
+
+def get_trie(tokenizer, words) -> TokenTrie:
+    """Token trie for a lexicon, cached per (tokenizer, word set)"""
+    words = tuple(sorted({normalize_word(w) for w in words if normalize_word(w)}))
+    if not words:
+        raise ValueError("Empty lexicon")
+    return _build_trie(tokenizer, words)
+
+
+class LexiconLogitsProcessor:
+    """
+    Restrict generation to paths of a TokenTrie: after the decoder prompt
+    only tokens that continue a lexicon word are allowed, and end-of-text
+    only once a complete word has been produced. Follows the transformers
+    LogitsProcessor interface (not subclassed, so transformers is only
+    imported when decoding).
+    """
+
+    def __init__(self, trie: TokenTrie, prompt_length: int, eos_token_id: int):
+        self.trie = trie
+        self.prompt_length = prompt_length
+        self.eos_token_id = eos_token_id
+
+    def __call__(self, input_ids, scores):
+        if input_ids.shape[1] < self.prompt_length:
+            return scores
+        import torch
+        mask = torch.full_like(scores, float("-inf"))
+        for row, ids in enumerate(input_ids[:, self.prompt_length:].tolist()):
+            node = self.trie.node(ids)
+            allowed = [] if node is None else list(node.children)
+            if node is None or node.word is not None:
+                allowed.append(self.eos_token_id)
+            mask[row, allowed] = 0
+        scores = scores + mask
+        # Other processors may have suppressed every allowed token: end there
+        dead = torch.isinf(scores).all(dim=-1)
+        scores[dead, self.eos_token_id] = 0
+        return scores
+
+
+def _prompt_ids(model, processor) -> list:
+    """Decoder prompt used by GREEDY_KWARGS: start, language, task, no timestamps"""
+    forced = processor.get_decoder_prompt_ids(language=GREEDY_KWARGS["language"], task=GREEDY_KWARGS["task"],
+                                              no_timestamps=True)
+    return [model.config.decoder_start_token_id] + [token for _, token in forced]
+
+
+def score_candidates(model, trie: TokenTrie, prompt_ids: list, hidden_state, eos_token_id: int) -> list:
+    """
+    Teacher-forced score of every lexicon word for one clip: mean token
+    log-probability of the word plus end-of-text, best spelling variant.
+
+    Returns:
+        List of {"word", "score"} sorted from best to worst
+    """
+    import torch
+    best = {}
+    for start in range(0, len(trie.sequences), SCORE_CHUNK_SIZE):
+        chunk = trie.sequences[start:start + SCORE_CHUNK_SIZE]
+        sequences = [prompt_ids + ids + [eos_token_id] for _, ids in chunk]
+        length = max(len(s) for s in sequences)
+        tokens = torch.full((len(sequences), length), eos_token_id, dtype=torch.long)
+        target_mask = torch.zeros((len(sequences), length - 1))
+        for i, sequence in enumerate(sequences):
+            tokens[i, :len(sequence)] = torch.tensor(sequence)
+            target_mask[i, len(prompt_ids) - 1:len(sequence) - 1] = 1
+        tokens = tokens.to(hidden_state.device)
+        target_mask = target_mask.to(hidden_state.device)
+
+        with torch.no_grad():
+            hidden = hidden_state.expand(len(sequences), -1, -1)
+            logits = model(encoder_outputs=(hidden,), decoder_input_ids=tokens[:, :-1]).logits
+        log_probs = torch.log_softmax(logits.float(), dim=-1)
+        token_log_probs = log_probs.gather(-1, tokens[:, 1:, None]).squeeze(-1)
+        scores = (token_log_probs * target_mask).sum(dim=1) / target_mask.sum(dim=1)
+        for (word, _), score in zip(chunk, scores.tolist()):
+            best[word] = max(score, best.get(word, float("-inf")))
+    return [{"word": word, "score": score}
+            for word, score in sorted(best.items(), key=lambda item: item[1], reverse=True)]
+
+
+def constrained_transcribe(model, processor, encoder_outputs, words) -> dict:
+    """
+    Decode one clip restricted to a lexicon. Generation stops after a
+    handful of steps: the longest word's token count plus end-of-text (the
+    budget also covers the prompt, for versions that force it token by token).
+
+    Returns:
+        Dict with the recognized word, its score and the scores of all candidates
+    """
+    if not is_torch_model(model):
+        raise ValueError("Lexicon-constrained decoding needs a PyTorch backend")
+    from transformers import LogitsProcessorList
+    trie = get_trie(processor.tokenizer, words)
+    prompt_ids = _prompt_ids(model, processor)
+    eos_token_id = processor.tokenizer.eos_token_id
+    processors = LogitsProcessorList([LexiconLogitsProcessor(trie, len(prompt_ids), eos_token_id)])
+
+    generated_ids = decoding.generate(model, None, encoder_outputs=encoder_outputs,
+                                      logits_processor=processors, max_new_tokens=trie.depth + len(prompt_ids),
+                                      **GREEDY_KWARGS)
+    text = processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
+    candidates = score_candidates(model, trie, prompt_ids, encoder_outputs.last_hidden_state[:1], eos_token_id)
+    scores = {c["word"]: c["score"] for c in candidates}
+    word = normalize_word(text)
+    if word not in scores:
+        word = candidates[0]["word"]
+    return {"word": word, "score": scores[word], "candidates": candidates}
@@ -0,0 +1,125 @@
+import re
+import numpy as np
+
+SAMPLE_RATE = 16000
+# Whisper's encoder sees at most 30 seconds per window
+WINDOW_SECONDS = 30.0
+
+
+def _frame_energy(audio: np.ndarray, frame: int) -> np.ndarray:
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return np.zeros(0)
+    frames = audio[:n_frames * frame].reshape(n_frames, frame).astype(np.float64)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+
+def plan_windows(audio: np.ndarray, sr: int = SAMPLE_RATE, window_s: float = WINDOW_SECONDS,
+                 overlap_s: float = 2.0, search_s: float = 5.0, frame_ms: int = 20,
+                 silence_ratio: float = 0.1) -> list:
+    """
+    Split a recording into windows of at most window_s seconds.
+
+    Each window ends at the quietest frame in the last search_s seconds; if
+    that frame is silence (below silence_ratio of the median frame energy)
+    the next window starts there with no overlap, otherwise the next window
+    starts overlap_s earlier so that a word cut in half appears in both.
+
+    Returns:
+        List of (start_sample, end_sample, overlapped_with_previous)
+    """
+    window = int(window_s * sr)
+    if len(audio) <= window:
+        return [(0, len(audio), False)]
+
+    frame = int(sr * frame_ms / 1000)
+    energy = _frame_energy(audio, frame)
+    silence_level = silence_ratio * (np.median(energy) if len(energy) else 0.0)
+    overlap = int(overlap_s * sr)
+    search = int(search_s * sr)
+
+    windows = []
+    start = 0
+    overlapped = False
+    while start < len(audio):
+        end = min(start + window, len(audio))
+        if end == len(audio):
+            windows.append((start, end, overlapped))
+            break
+        lo = max(start + window - search, start + 1) // frame
+        hi = end // frame
+        quiet = lo + int(np.argmin(energy[lo:hi]))
+        cut = quiet * frame
+        if cut <= start:
+            quiet, cut = hi - 1, end
+        windows.append((start, cut, overlapped))
+        if energy[quiet] <= silence_level:
+            start, overlapped = cut, False
+        else:
+            start, overlapped = max(cut - overlap, start + 1), True
+    return windows
+
+
+def _normalize_word(word: str) -> str:
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def merge_overlap(previous: list, current: list, max_words: int = 12) -> list:
+    """
+    Drop the words at the start of current that repeat the end of previous.
+
+    Looks for the longest run (up to max_words) where the tail of previous
+    matches the head of current, ignoring case and punctuation.
+    """
+    prev_norm = [_normalize_word(w) for w in previous[-max_words:]]
+    curr_norm = [_normalize_word(w) for w in current[:max_words]]
+    for size in range(min(len(prev_norm), len(curr_norm)), 0, -1):
+        if prev_norm[-size:] == curr_norm[:size]:
+            return current[size:]
+    return current
+
+
+def stitch_segments(windows: list, texts: list, sr: int = SAMPLE_RATE) -> tuple:
+    """
+    Merge per-window transcripts into one transcript with segment timestamps
+
+    Returns:
+        Tuple of (transcript, segments)
+    """
+    words = []
+    segments = []
+    for (start, end, overlapped), text in zip(windows, texts):
+        segment_words = text.split()
+        if overlapped:
+            segment_words = merge_overlap(words, segment_words)
+        words.extend(segment_words)
+        segments.append({
+            "start": round(start / sr, 2),
+            "end": round(end / sr, 2),
+            "text": " ".join(segment_words),
+        })
+    return " ".join(words), segments
+
+
+def transcribe_long(audio: np.ndarray, transcribe_fn, batch_size: int = 8, sr: int = SAMPLE_RATE,
+                    **window_kwargs) -> tuple:
+    """
+    Long-form transcription of a recording of any length.
+
+    Windows are views into audio (no copies) and are transcribed batch_size
+    at a time, so memory stays bounded by the batch, not the recording.
+
+    Args:
+        audio: 16 kHz float32 waveform
+        transcribe_fn: Callable taking a list of waveforms and returning transcripts
+        batch_size: Windows per generate call
+
+    Returns:
+        Tuple of (transcript, segments)
+    """
+    windows = plan_windows(audio, sr=sr, **window_kwargs)
+    texts = []
+    for i in range(0, len(windows), batch_size):
+        batch = windows[i:i + batch_size]
+        texts.extend(transcribe_fn([audio[start:end] for start, end, _ in batch]))
+    return stitch_segments(windows, texts, sr=sr)
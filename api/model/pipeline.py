@@ -0,0 +1,147 @@
+import os
+import time
+import numpy as np
+from typing import Union, Optional
+
+from trainer.utils.preprocess import AudioPreprocessor, DEFAULT_PREPROCESSOR_CONFIG, preprocess_waveform
+from api.model.analyzer import analyze_audio, model_settings
+from api.utils.audio_io import decode_audio_bytes, TARGET_SR
+from api.utils.cache import ResultCache, make_cache_key
+from api.utils.metrics import observe_stage, AUDIO_DURATION_SECONDS, REAL_TIME_FACTOR
+
+
+class SpeechPipeline:
+    """
+    Array-in/array-out analysis pipeline: decode -> preprocess -> analyze.
+
+    Every stage passes a 16 kHz float32 waveform to the next one, so the
+    preprocessed audio is what the model actually transcribes.
+    """
+
+    def __init__(self, base: bool = False, preprocess: bool = True,
+                 preprocessor: Optional[AudioPreprocessor] = None,
+                 cache: Optional[ResultCache] = None):
+        """
+        Args:
+            base: Use the base Whisper model instead of the fine-tuned one
+            preprocess: Whether to run the AudioPreprocessor chain
+            preprocessor: Preprocessor to use (defaults to DEFAULT_PREPROCESSOR_CONFIG)
+            cache: Optional result cache keyed by decoded audio and settings
+        """
+        self.base = base
+        self.preprocess = preprocess
+        self.preprocessor = preprocessor or AudioPreprocessor(**DEFAULT_PREPROCESSOR_CONFIG, verbose=False)
+        self.cache = cache
+
+    @property
+    def model_name(self) -> str:
+        return "base" if self.base else "finetuned"
+
+    def settings(self, targets: Optional[list] = None) -> dict:
+        """Model, decoding and preprocessing settings that affect the result"""
+        preprocessing = None
+        if self.preprocess:
+            preprocessing = {key: getattr(self.preprocessor, key) for key in DEFAULT_PREPROCESSOR_CONFIG}
+        return {**model_settings(self.model_name), "preprocessing": preprocessing,
+                "targets": sorted(targets) if targets else None}
+
+    def cache_key(self, audio: np.ndarray, targets: Optional[list] = None) -> str:
+        return make_cache_key(audio, **self.settings(targets))
+
+    def decode(self, source: Union[bytes, str, np.ndarray]) -> np.ndarray:
+        """Turn upload bytes, a file path or an array into a 16 kHz float32 waveform"""
+        if isinstance(source, np.ndarray):
+            return source.astype(np.float32, copy=False)
+        if isinstance(source, (bytes, bytearray)):
+            return decode_audio_bytes(bytes(source), TARGET_SR)
+        audio, sr = self.preprocessor.load_audio(source)
+        if audio.ndim > 1:
+            audio = np.mean(audio, axis=1)
+        return self.preprocessor.resample_audio(audio, sr).astype(np.float32)
+
+    def run_with_timings(self, source: Union[bytes, str, np.ndarray], targets: Optional[list] = None):
+        """
+        Run the full pipeline and return (analysis, per-stage seconds).
+        targets restricts the transcript to a word list (see analyze_audio).
+        Results served from the cache are left out of the duration and
+        real-time-factor histograms.
+        """
+        timings = {}
+        started = time.perf_counter()
+        audio = self.decode(source)
+        timings["decode"] = time.perf_counter() - started
+        observe_stage("decode", timings["decode"])
+
+        computed = []
+        try:
+            return self._run_decoded(audio, timings, targets, computed), timings
+        finally:
+            duration = len(audio) / TARGET_SR
+            if computed:
+                AUDIO_DURATION_SECONDS.observe(duration)
+                if duration > 0:
+                    REAL_TIME_FACTOR.observe((time.perf_counter() - started) / duration)
+
+    def _run_decoded(self, audio: np.ndarray, timings: dict, targets: Optional[list] = None,
+                     computed: Optional[list] = None) -> dict:
+        """Analyze unless cached; appends to computed when this call ran the analysis"""
+        def compute():
+            if computed is not None:
+                computed.append(True)
+            return self._analyze(audio, timings, targets)
+
+        if self.cache is None:
+            return compute()
+
+        # Identical audio + settings is served from cache, or waits for the
+        # request that is already computing it
+        return self.cache.get_or_compute(self.cache_key(audio, targets), compute,
+                                         store_if=lambda r: bool(r.get("metrics")))
+
+    def _analyze(self, audio: np.ndarray, timings: dict, targets: Optional[list] = None) -> dict:
+        if self.preprocess:
+            steps = {}
+            start = time.perf_counter()
+            audio = preprocess_waveform(audio, TARGET_SR, self.preprocessor, timings=steps)
+            timings["preprocess"] = time.perf_counter() - start
+            for step, seconds in steps.items():
+                timings[f"preprocess_{step}"] = seconds
+                observe_stage(f"preprocess_{step}", seconds)
+
+        start = time.perf_counter()
+        result = analyze_audio(audio, base=self.base, targets=targets)
+        timings["analyze"] = time.perf_counter() - start
+        return result
+
+    def __call__(self, source: Union[bytes, str, np.ndarray], targets: Optional[list] = None) -> dict:
+        return self.run_with_timings(source, targets)[0]
+
+
+def benchmark_pipeline(csv_path: str = "data/cleaned_audio_data.csv", limit: int = 50, base: bool = False):
+    """Run files from the manifest through the pipeline and report mean stage times"""
+    import pandas as pd
+
+    if not os.path.exists(csv_path):
+        print(f"CSV file not found: {csv_path}")
+        return
+
+    df = pd.read_csv(csv_path).head(limit)
+    pipeline = SpeechPipeline(base=base)
+    totals = {}
+    count = 0
+    for _, row in df.iterrows():
+        if not os.path.exists(row['file_path']):
+            continue
+        _, timings = pipeline.run_with_timings(row['file_path'])
+        for stage, seconds in timings.items():
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        count += 1
+
+    print(f"Pipeline benchmark over {count} files")
+    print("=" * 40)
+    for stage, seconds in totals.items():
+        print(f"  {stage:<12} {1000 * seconds / max(count, 1):8.1f} ms/file")
+
+
+if __name__ == "__main__":
+    benchmark_pipeline()
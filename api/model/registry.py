@@ -0,0 +1,270 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from api.model import short_input
+from api.model.backends import load_whisper, model_dtype, is_torch_model, DEFAULT_CACHE_DIR
+
+
+def _tensor_bytes(value, seen: set) -> int:
+    """Bytes of a state_dict value; packed params come as (weight, bias) tuples"""
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_bytes(item, seen) for item in value)
+    if not hasattr(value, "element_size"):
+        return 0
+    # Tied weights (e.g. proj_out and embed_tokens) are stored once
+    key = (value.data_ptr(), value.numel())
+    if key in seen:
+        return 0
+    seen.add(key)
+    return value.numel() * value.element_size()
+
+
+def _model_size_bytes(model) -> int:
+    """
+    Approximate resident size of a model from its state_dict. Unlike
+    parameters(), this includes dynamic-int8 Linear weights, which live in
+    packed params.
+    """
+    if not hasattr(model, "parameters"):
+        # ONNX Runtime model: use the size of the exported graphs
+        model_dir = str(getattr(model, "model_save_dir", ""))
+        if not os.path.isdir(model_dir):
+            return 0
+        return sum(os.path.getsize(os.path.join(model_dir, f))
+                   for f in os.listdir(model_dir) if f.endswith((".onnx", ".onnx_data")))
+    seen = set()
+    return sum(_tensor_bytes(value, seen) for value in model.state_dict().values())
+
+
+class ModelHandle:
+    """
+    Shared handle to a loaded Whisper variant
+    """
+
+    def __init__(self, name: str, model, processor, device, backend: str = "fp32", source: str = None):
+        self.name = name
+        self.source = source
+        self.model = model
+        self.processor = processor
+        self.device = device
+        self.backend = backend
+        self.dtype = model_dtype(model)
+        self.size_bytes = _model_size_bytes(model)
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.in_use = 0
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of Whisper models.
+
+    Each configured variant is loaded at most once and handed out as a shared
+    handle. When loading a new variant would exceed the memory budget, the
+    least-recently-used variants that are not currently in use are evicted.
+    """
+
+    def __init__(self, variants: dict, memory_budget_bytes: int = 0,
+                 backend: str = "fp32", cache_dir: str = DEFAULT_CACHE_DIR):
+        """
+        Args:
+            variants: Mapping of variant name to a model id or checkpoint path
+            memory_budget_bytes: Maximum combined model size (0 disables the budget)
+            backend: Inference backend for every variant ("fp32", "int8" or "bf16")
+            cache_dir: Where quantized artifacts are cached
+        """
+        self.variants = dict(variants)
+        self.memory_budget_bytes = memory_budget_bytes
+        self.backend = backend
+        self.cache_dir = cache_dir
+        self._handles = OrderedDict()
+        self._lock = threading.RLock()
+        # Notified whenever a lease ends (used to drain swapped-out models)
+        self._released = threading.Condition(self._lock)
+        self._loading = {}
+        # Bumped on every hot swap so cached results of older weights are not reused
+        self._versions = {}
+
+    def _load(self, name: str, source: str = None) -> ModelHandle:
+        if name not in self.variants:
+            raise KeyError(f"Unknown model variant: {name}")
+        source = source or self.variants[name]
+        print(f"Loading model variant '{name}' from {source}...")
+        start = time.perf_counter()
+        model, processor, device, backend = load_whisper(source, self.backend, self.cache_dir)
+        handle = ModelHandle(name, model, processor, device, backend, source)
+        print(f"Loaded '{name}' ({backend}) on {device} in {time.perf_counter() - start:.1f}s "
+              f"({handle.size_bytes / 1e6:.0f} MB)")
+        return handle
+
+    def _evict_for(self, incoming_bytes: int):
+        """Evict idle LRU variants until incoming_bytes fits in the budget"""
+        if not self.memory_budget_bytes:
+            return
+        for name in list(self._handles.keys()):
+            if self.used_bytes() + incoming_bytes <= self.memory_budget_bytes:
+                return
+            handle = self._handles[name]
+            if handle.in_use:
+                continue
+            self._release(name)
+        if self.used_bytes() + incoming_bytes > self.memory_budget_bytes:
+            print(f"Warning: model memory budget exceeded "
+                  f"({(self.used_bytes() + incoming_bytes) / 1e6:.0f} MB > "
+                  f"{self.memory_budget_bytes / 1e6:.0f} MB); all other variants are in use")
+
+    def _release(self, name: str):
+        handle = self._handles.pop(name)
+        print(f"Evicting model variant '{name}' ({handle.size_bytes / 1e6:.0f} MB)")
+        self._free(handle)
+
+    def _free(self, handle: ModelHandle):
+        if is_torch_model(handle.model):
+            short_input.clear_cache(handle.model)
+        handle.model = None
+        handle.processor = None
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def get(self, name: str) -> ModelHandle:
+        """Return the shared handle for a variant, loading it if necessary"""
+        with self._lock:
+            handle = self._handles.get(name)
+            if handle is not None:
+                self._handles.move_to_end(name)
+                handle.last_used = time.time()
+                return handle
+            # Only one thread loads a given variant; others wait for it
+            event = self._loading.get(name)
+            if event is None:
+                event = threading.Event()
+                self._loading[name] = event
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            event.wait()
+            return self.get(name)
+
+        try:
+            handle = self._load(name)
+            with self._lock:
+                self._evict_for(handle.size_bytes)
+                self._handles[name] = handle
+                handle.last_used = time.time()
+            return handle
+        finally:
+            with self._lock:
+                self._loading.pop(name, None)
+            event.set()
+
+    @contextmanager
+    def lease(self, name: str):
+        """Hold a variant for the duration of a request so it is not evicted"""
+        while True:
+            handle = self.get(name)
+            with self._lock:
+                # The variant may have been evicted between get() and here
+                if self._handles.get(name) is handle:
+                    handle.in_use += 1
+                    break
+        try:
+            yield handle
+        finally:
+            with self._lock:
+                handle.in_use -= 1
+                self._released.notify_all()
+
+    def swap(self, name: str, source: str = None, warm_up_fn=None, drain_timeout: float = 300.0) -> ModelHandle:
+        """
+        Hot-swap a variant to new weights without dropping requests.
+
+        The new checkpoint is loaded and warmed up next to the serving one.
+        If either step fails, the exception is raised and the old model keeps
+        serving (rollback). Otherwise the handle is swapped atomically: new
+        leases get the new model, and the old weights are freed once the
+        requests still holding them have finished.
+
+        Args:
+            name: Variant to replace
+            source: Checkpoint to load (defaults to the variant's current source)
+            warm_up_fn: Called with the new handle before the swap; raise to abort
+            drain_timeout: Seconds to wait for in-flight requests on the old model
+        """
+        source = source or self.variants[name]
+        handle = self._load(name, source)
+        try:
+            if warm_up_fn is not None:
+                warm_up_fn(handle)
+        except Exception:
+            self._free(handle)
+            raise
+
+        with self._lock:
+            # Both copies are resident until the old one has drained
+            self._evict_for(handle.size_bytes)
+            old = self._handles.get(name)
+            self._handles[name] = handle
+            self._handles.move_to_end(name)
+            self.variants[name] = source
+            self._versions[name] = self._versions.get(name, 0) + 1
+            handle.last_used = time.time()
+            print(f"Swapped model variant '{name}' to {source} (version {self._versions[name]})")
+            if old is None:
+                return handle
+            drained = self._released.wait_for(lambda: old.in_use == 0, timeout=drain_timeout)
+        if drained:
+            print(f"Freeing previous '{name}' weights ({old.size_bytes / 1e6:.0f} MB)")
+            self._free(old)
+        else:
+            # The old weights are garbage collected when the last of these requests ends
+            print(f"Warning: {old.in_use} request(s) still use the previous '{name}' weights")
+            if is_torch_model(old.model):
+                short_input.clear_cache(old.model)
+        return handle
+
+    def version(self, name: str) -> int:
+        """How many times a variant has been hot-swapped"""
+        return self._versions.get(name, 0)
+
+    def preload(self, names):
+        """Load the given variants up front"""
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"Warning: could not preload model variant '{name}': {e}")
+
+    def used_bytes(self) -> int:
+        return sum(handle.size_bytes for handle in self._handles.values())
+
+    def clear(self):
+        with self._lock:
+            for name in list(self._handles.keys()):
+                self._release(name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "used_bytes": self.used_bytes(),
+                "loaded": [
+                    {
+                        "name": handle.name,
+                        "source": handle.source,
+                        "version": self.version(handle.name),
+                        "size_bytes": handle.size_bytes,
+                        "device": str(handle.device),
+                        "backend": handle.backend,
+                        "in_use": handle.in_use,
+                        "last_used": handle.last_used,
+                    }
+                    for handle in self._handles.values()
+                ],
+            }
@@ -0,0 +1,88 @@
+import copy
+import math
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import torch
+
+# Whisper features: 100 mel frames per second, 3000 frames (30 s) per window.
+# The encoder's two convolutions halve the frame rate, so N frames -> N // 2 positions.
+FRAMES_PER_SECOND = 100
+FULL_FRAMES = 3000
+HOP_LENGTH = 160
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def bucket_frames(n_samples: int, bucket_frames_size: int = 200) -> int:
+    """Mel frames needed for n_samples, rounded up to a multiple of the bucket size"""
+    frames = math.ceil(n_samples / HOP_LENGTH)
+    frames = bucket_frames_size * max(1, math.ceil(frames / bucket_frames_size))
+    return min(frames, FULL_FRAMES)
+
+
+def trained_bucket_frames(model):
+    """
+    Bucket size the checkpoint was fine-tuned with (saved in its config by
+    trainer/short_input_finetune.py), or None for models never trained on
+    truncated inputs, which must keep the full 30 s window
+    """
+    return getattr(model.config, "short_input_bucket_frames", None)
+
+
+def truncate_features(input_features: "torch.Tensor", frames: int) -> "torch.Tensor":
+    """Keep the first frames of 30-second padded log-mel features"""
+    return input_features[..., :frames].contiguous()
+
+
+def short_encoder(model, frames: int):
+    """
+    Encoder that accepts `frames` mel frames instead of 3000.
+
+    It is a shallow copy of the model's encoder: all layers (and weights) are
+    shared, only the positional embedding is a view of the first frames // 2
+    rows and the expected input length is adjusted. Copies are cached per
+    (model, frames).
+    """
+    encoder = model.get_encoder()
+    if frames >= FULL_FRAMES:
+        return encoder
+    from torch import nn
+    key = (id(encoder), frames)
+    with _encoders_lock:
+        cached = _encoders.get(key)
+        if cached is not None and cached[0] is encoder:
+            return cached[1]
+        positions = frames // 2
+        short = copy.copy(encoder)
+        short._modules = dict(encoder._modules)
+        short._parameters = dict(encoder._parameters)
+        short._buffers = dict(encoder._buffers)
+        embedding = nn.Embedding(positions, encoder.embed_positions.embedding_dim)
+        embedding.weight = nn.Parameter(encoder.embed_positions.weight.detach()[:positions], requires_grad=False)
+        short._modules["embed_positions"] = embedding
+        short.config = copy.copy(encoder.config)
+        short.config.max_source_positions = positions
+        short.max_source_positions = positions
+        _encoders[key] = (encoder, short)
+        return short
+
+
+def encode_short(model, input_features: "torch.Tensor", frames: int):
+    """Run the bucketed encoder on truncated features"""
+    import torch
+    with torch.no_grad():
+        return short_encoder(model, frames)(truncate_features(input_features, frames), return_dict=True)
+
+
+def clear_cache(model=None):
+    """Drop cached short encoders (all, or those of one model)"""
+    with _encoders_lock:
+        if model is None:
+            _encoders.clear()
+            return
+        encoder_id = id(model.get_encoder())
+        for key in [k for k in _encoders if k[0] == encoder_id]:
+            del _encoders[key]
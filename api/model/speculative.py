@@ -0,0 +1,108 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class _CallCounter:
+    def __init__(self):
+        self.calls = 0
+
+
+def _decoder(model):
+    """The decoder module whose forward runs once per decoding step"""
+    return model.get_decoder() if hasattr(model, "get_decoder") else model.model.decoder
+
+
+# Counters of the assisted decode running on the current thread, by decoder id
+_local = threading.local()
+_hook_lock = threading.Lock()
+
+
+def _count_call(module, inputs, output):
+    counters = getattr(_local, "counters", None)
+    if counters is not None and id(module) in counters:
+        counters[id(module)].calls += 1
+
+
+def _ensure_hook(decoder):
+    """Install the shared counting hook once per decoder module"""
+    with _hook_lock:
+        if getattr(decoder, "_call_count_hook", None) is None:
+            decoder._call_count_hook = decoder.register_forward_hook(_count_call)
+
+
+@contextmanager
+def count_decoder_calls(model, assistant_model):
+    """
+    Count decoder forward passes of the main and assistant models. Counts are
+    kept per thread, so concurrent assisted decodes on the same models do not
+    see each other's calls.
+    """
+    main_counter, draft_counter = _CallCounter(), _CallCounter()
+    main_decoder, draft_decoder = _decoder(model), _decoder(assistant_model)
+    _ensure_hook(main_decoder)
+    _ensure_hook(draft_decoder)
+    previous = getattr(_local, "counters", None)
+    _local.counters = {id(main_decoder): main_counter, id(draft_decoder): draft_counter}
+    try:
+        yield main_counter, draft_counter
+    finally:
+        _local.counters = previous
+
+
+def decoder_prompt_length(model, generated_ids) -> int:
+    """
+    Number of forced prompt tokens (start of transcript, language, task,
+    no-timestamps) at the start of the generated sequence
+    """
+    config = model.generation_config
+    prompt_ids = {config.decoder_start_token_id, getattr(config, "no_timestamps_token_id", None)}
+    prompt_ids.update((getattr(config, "lang_to_id", None) or {}).values())
+    prompt_ids.update((getattr(config, "task_to_id", None) or {}).values())
+    length = 0
+    for token_id in generated_ids[0].tolist():
+        if token_id not in prompt_ids:
+            break
+        length += 1
+    return length
+
+
+def assisted_generate(model, assistant_model, input_features, attention_mask=None, prompt_length: int = None,
+                      **kwargs):
+    """
+    Greedy generate with an assistant model drafting tokens that the main
+    model verifies. With do_sample=False and num_beams=1 the output equals
+    plain greedy decoding of the main model. Assisted generation works on
+    one clip at a time. The acceptance rate is estimated from decoder call
+    counts: each verification pass emits its accepted draft tokens plus one.
+    prompt_length is the number of forced decoder prompt tokens in the
+    output; by default it is read from the output itself.
+
+    Returns:
+        Tuple of (generated_ids, stats) where stats has new_tokens,
+        main_calls, draft_calls, acceptance_rate and seconds
+    """
+    if input_features.shape[0] != 1:
+        raise ValueError("Assisted generation needs batch size 1")
+    import torch
+    kwargs = {**kwargs, "do_sample": False, "num_beams": 1}
+    start = time.perf_counter()
+    with torch.no_grad(), count_decoder_calls(model, assistant_model) as (main, draft):
+        generated_ids = model.generate(
+            input_features,
+            attention_mask=attention_mask,
+            assistant_model=assistant_model,
+            **kwargs,
+        )
+    seconds = time.perf_counter() - start
+    if prompt_length is None:
+        prompt_length = decoder_prompt_length(model, generated_ids)
+    new_tokens = max(0, generated_ids.shape[-1] - prompt_length)
+    accepted = max(0, new_tokens - main.calls)
+    return generated_ids, {
+        "new_tokens": new_tokens,
+        "main_calls": main.calls,
+        "draft_calls": draft.calls,
+        "acceptance_rate": accepted / draft.calls if draft.calls else 0.0,
+        "seconds": seconds,
+    }
@@ -0,0 +1,219 @@
+"""
+Multi-worker server that loads the model weights once.
+
+The parent process preloads the registry's models, then forks the uvicorn
+workers, which share the weight pages copy-on-write instead of each loading
+its own copy of whisper-medium. Run from the repo root:
+
+    ANALYZER_SERVE_WORKERS=4 python -m api.serve
+
+Variants that are not preloaded are still loaded lazily per worker (private).
+GET /memory on any worker, or the parent's periodic report, shows how much
+of each worker's memory is private.
+
+Hot swaps also happen in the parent, so the weights stay shared: it runs the
+checkpoint watcher (ANALYZER_WATCH_CHECKPOINT) and reloads on SIGHUP, which
+POST /admin/reload on a worker sends. After a swap the workers are replaced
+one by one by fresh forks on the new weights; the old ones finish their
+requests before exiting.
+
+Forking is only safe while the parent holds no thread pools or locks, so:
+
+- the parent never runs inference. Workers warm up in their own lifespan,
+  and a new checkpoint is warmed up in a short-lived fork before the swap;
+- torch is limited to one thread in the parent before anything is loaded,
+  so no OpenMP or inter-op pool exists when it forks (each worker then sets
+  its own thread count);
+- workers are re-forked only when no reload is running. The watcher and
+  SIGHUP reload threads still exist at that point but hold no locks, and
+  the children never use them.
+
+Libraries that start threads of their own while loading a checkpoint are
+not covered by this; the single-worker mode (ANALYZER_SERVE_WORKERS=1)
+does not fork at all.
+"""
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+import torch
+import uvicorn
+
+import api.main
+from api.main import app, WATCH_CHECKPOINT, WATCH_INTERVAL_SECONDS
+from api.model.analyzer import registry, warm_up_handle, PRELOAD_MODELS
+from api.model.hotswap import CheckpointWatcher, reload_in_background, reload_in_progress
+from api.utils.memory import process_memory
+
+HOST = os.environ.get("ANALYZER_HOST", "localhost")
+PORT = int(os.environ.get("ANALYZER_PORT", "8000"))
+SERVE_WORKERS = int(os.environ.get("ANALYZER_SERVE_WORKERS", str(os.cpu_count() or 1)))
+# Seconds between per-worker memory reports from the parent (0 disables them)
+MEMORY_REPORT_INTERVAL = float(os.environ.get("ANALYZER_MEMORY_REPORT_INTERVAL", "300"))
+
+
+def _bind_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((HOST, PORT))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(sock: socket.socket, threads: int):
+    """Child process: serve the app on the inherited socket"""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+    api.main.FORKED_WORKER = True
+    torch.set_num_threads(threads)
+    server = uvicorn.Server(uvicorn.Config(app, log_level="info"))
+    server.run(sockets=[sock])
+
+
+def _fork_worker(sock: socket.socket, threads: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(sock, threads)
+        except BaseException as e:
+            print(f"Worker {os.getpid()} failed: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def _warm_up_in_child(handle):
+    """
+    Hot-swap warm-up run in a short-lived fork, so that the parent never runs
+    inference; raises (aborting the swap) if the new checkpoint cannot decode
+    """
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            warm_up_handle(handle)
+        except BaseException as e:
+            print(f"Warm-up of the new checkpoint failed: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError("The new checkpoint failed its warm-up")
+
+
+def report_memory(pids):
+    """Print shared/private resident memory of the parent and every worker"""
+    print("Memory per process (MB):  rss  shared  private")
+    for label, pid in [("parent", os.getpid())] + [("worker", pid) for pid in pids]:
+        stats = process_memory(pid)
+        if "rss_bytes" not in stats:
+            continue
+        print(f"  {label} {pid:>7}:  {stats['rss_bytes'] / 1e6:6.0f} {stats['shared_bytes'] / 1e6:7.0f} "
+              f"{stats['private_bytes'] / 1e6:8.0f}")
+
+
+def _freeze_heap():
+    """Keep the collector from touching (and un-sharing) the preloaded objects"""
+    gc.unfreeze()
+    gc.collect()
+    gc.freeze()
+
+
+def serve(num_workers: int = SERVE_WORKERS):
+    if num_workers <= 1 or torch.cuda.is_available() or not hasattr(os, "fork"):
+        if num_workers > 1:
+            print("Warning: shared-weight workers need fork on CPU, running a single worker")
+        uvicorn.run(app, host=HOST, port=PORT, log_level="info")
+        return
+
+    # Before any torch work, so the parent never starts a thread pool that forked children would inherit broken
+    torch.set_num_threads(1)
+    start = time.perf_counter()
+    registry.preload(PRELOAD_MODELS)
+    print(f"Preloaded {PRELOAD_MODELS} in {time.perf_counter() - start:.1f}s")
+    _freeze_heap()
+
+    sock = _bind_socket()
+    threads = max(1, (os.cpu_count() or 1) // num_workers)
+    workers = {_fork_worker(sock, threads) for _ in range(num_workers)}
+    print(f"Serving on http://{HOST}:{PORT} with {num_workers} workers ({threads} threads each)")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def request_reload(signum, frame):
+        if not reload_in_background("finetuned", warm_up_fn=_warm_up_in_child):
+            print("A reload is already in progress")
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGHUP, request_reload)
+
+    watcher = None
+    if WATCH_CHECKPOINT:
+        watcher = CheckpointWatcher("finetuned", poll_seconds=WATCH_INTERVAL_SECONDS, warm_up_fn=_warm_up_in_child)
+        watcher.start()
+
+    version = registry.version("finetuned")
+    # Workers still draining requests on the previous weights
+    retiring = set()
+    last_report = time.monotonic()
+    while workers or retiring:
+        # Wait for the workers only: the warm-up fork of a reload is reaped by its own thread
+        exited = []
+        for child in workers | retiring:
+            try:
+                pid, status = os.waitpid(child, os.WNOHANG)
+            except ChildProcessError:
+                pid, status = child, 0
+            if pid:
+                exited.append((pid, status))
+        for pid, status in exited:
+            workers.discard(pid)
+            if pid in retiring:
+                retiring.discard(pid)
+            elif not stopping:
+                # The weights are still in the parent: a replacement starts instantly
+                print(f"Worker {pid} exited with status {status}, restarting it")
+                workers.add(_fork_worker(sock, threads))
+        if exited:
+            continue
+        # Fork only once the reload thread is done and holds no registry locks
+        if registry.version("finetuned") != version and not stopping and not reload_in_progress():
+            version = registry.version("finetuned")
+            _freeze_heap()
+            print(f"Restarting {len(workers)} workers on the new 'finetuned' weights (version {version})")
+            for old in list(workers):
+                workers.discard(old)
+                retiring.add(old)
+                workers.add(_fork_worker(sock, threads))
+                os.kill(old, signal.SIGTERM)
+            continue
+        if MEMORY_REPORT_INTERVAL and time.monotonic() - last_report >= MEMORY_REPORT_INTERVAL:
+            report_memory(sorted(workers))
+            last_report = time.monotonic()
+        time.sleep(0.5)
+    if watcher is not None:
+        watcher.stop()
+    sock.close()
+    print("All workers stopped.")
+
+
+if __name__ == "__main__":
+    serve(int(sys.argv[1]) if len(sys.argv) > 1 else SERVE_WORKERS)
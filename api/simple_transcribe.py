@@ -1,4 +1,5 @@
 import os
+import sys
 import torch
 import librosa
 import pandas as pd
@@ -7,6 +8,10 @@ from transformers import (
     WhisperForConditionalGeneration
 )
 
+# Allow running as `python api/simple_transcribe.py` from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trainer.utils.features import log_mel_features
+
 def load_whisper_medium():
     """Load the Whisper medium model and processor"""
     print("Loading Whisper Medium model...")
@@ -26,8 +31,7 @@ def transcribe_audio(audio_path, model, processor, device):
         audio, sr = librosa.load(audio_path, sr=16000)
 
         # Process audio
-        inputs = processor(audio, sampling_rate=16000, return_tensors="pt")
-        inputs = inputs.to(device)
+        inputs = log_mel_features(processor, [audio], device).to(device)
 
         # Generate transcription
         with torch.no_grad():
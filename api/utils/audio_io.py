@@ -0,0 +1,77 @@
+import io
+import subprocess
+
+import numpy as np
+import scipy.signal
+from scipy.io import wavfile
+
+TARGET_SR = 16000
+
+
+def _is_wav(data: bytes) -> bool:
+    return len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+def _to_float32(audio: np.ndarray) -> np.ndarray:
+    """Convert integer PCM to float32 in [-1, 1]"""
+    if audio.dtype == np.int16:
+        return audio.astype(np.float32) / 32768.0
+    if audio.dtype == np.int32:
+        return audio.astype(np.float32) / 2147483648.0
+    if audio.dtype == np.uint8:
+        return (audio.astype(np.float32) - 128.0) / 128.0
+    return audio.astype(np.float32, copy=False)
+
+
+def _resample(audio: np.ndarray, original_sr: int, target_sr: int) -> np.ndarray:
+    if original_sr == target_sr:
+        return audio
+    g = np.gcd(int(original_sr), int(target_sr))
+    return scipy.signal.resample_poly(audio, target_sr // g, original_sr // g).astype(np.float32)
+
+
+def decode_wav_bytes(data: bytes, target_sr: int = TARGET_SR) -> np.ndarray:
+    """Decode an in-memory WAV file to mono float32 at target_sr"""
+    sr, audio = wavfile.read(io.BytesIO(data))
+    audio = _to_float32(audio)
+    # Convert to mono if stereo
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    return _resample(audio, sr, target_sr)
+
+
+def decode_with_ffmpeg(data: bytes, target_sr: int = TARGET_SR) -> np.ndarray:
+    """Decode any ffmpeg-supported container (webm, m4a, ogg...) through a pipe"""
+    command = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-f", "f32le", "-acodec", "pcm_f32le",
+        "-ac", "1", "-ar", str(target_sr),
+        "pipe:1",
+    ]
+    try:
+        process = subprocess.run(command, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    except FileNotFoundError:
+        raise ValueError("ffmpeg is required to decode non-WAV uploads")
+    except subprocess.CalledProcessError as e:
+        raise ValueError(f"Could not decode audio: {e.stderr.decode(errors='ignore').strip()}")
+    return np.frombuffer(process.stdout, dtype=np.float32).copy()
+
+
+def decode_audio_bytes(data: bytes, target_sr: int = TARGET_SR) -> np.ndarray:
+    """
+    Decode uploaded audio bytes into a mono float32 array at target_sr.
+
+    WAV is parsed directly; everything else (the UI records webm even though
+    it names the file answer.wav) goes through an ffmpeg pipe.
+    """
+    if not data:
+        raise ValueError("Empty audio upload")
+    if _is_wav(data):
+        try:
+            return decode_wav_bytes(data, target_sr)
+        except Exception:
+            # Unusual WAV encodings (e.g. ADPCM) are left to ffmpeg
+            pass
+    return decode_with_ffmpeg(data, target_sr)
+
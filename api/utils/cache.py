@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+
+def make_cache_key(audio: np.ndarray, **settings) -> str:
+    """
+    Content address for an analysis: hash of the decoded samples plus every
+    setting that changes the result (model id, decoding, preprocessing).
+    """
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(audio, dtype=np.float32).tobytes())
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier (memory LRU + optional disk) cache for analysis results.
+
+    Both tiers evict by size and TTL. Concurrent requests for a key that is
+    already being computed wait for that computation instead of repeating it.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600,
+                 disk_dir: str = None, disk_max_bytes: int = 256 * 1024 * 1024, disk_ttl_seconds: float = None):
+        """
+        Args:
+            max_entries: Maximum number of results kept in memory
+            ttl_seconds: Lifetime of in-memory entries (0 disables expiry)
+            disk_dir: Directory for the on-disk tier (None disables it)
+            disk_max_bytes: Maximum total size of the on-disk tier
+            disk_ttl_seconds: Lifetime of on-disk entries (defaults to ttl_seconds)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_ttl_seconds = ttl_seconds if disk_ttl_seconds is None else disk_ttl_seconds
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    # Memory tier
+
+    def _memory_get(self, key: str):
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if self.ttl_seconds and time.time() - stored_at > self.ttl_seconds:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_put(self, key: str, value):
+        self._memory[key] = (time.time(), value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    # Disk tier
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _disk_get(self, key: str):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if self.disk_ttl_seconds and time.time() - os.path.getmtime(path) > self.disk_ttl_seconds:
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _disk_put(self, key: str, value):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+            self._disk_evict()
+        except (OSError, TypeError) as e:
+            print(f"Warning: could not write cache entry {key}: {e}")
+
+    def _disk_evict(self):
+        entries = []
+        total = 0
+        now = time.time()
+        for filename in os.listdir(self.disk_dir):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(self.disk_dir, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if self.disk_ttl_seconds and now - stat.st_mtime > self.disk_ttl_seconds:
+                os.remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        # Oldest entries go first
+        for _, size, path in sorted(entries):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                self._counters["evictions"] += 1
+            except OSError:
+                pass
+
+    # Public API
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._memory_get(key)
+            if value is not None:
+                self._counters["memory_hits"] += 1
+                return value
+        value = self._disk_get(key)
+        if value is not None:
+            with self._lock:
+                self._counters["disk_hits"] += 1
+                self._memory_put(key, value)
+        return value
+
+    def put(self, key: str, value):
+        with self._lock:
+            self._memory_put(key, value)
+        self._disk_put(key, value)
+
+    def get_or_compute(self, key: str, compute, store_if=None):
+        """
+        Return the cached value for key, computing it at most once at a time
+
+        Args:
+            key: Cache key (see make_cache_key)
+            compute: Callable producing the value on a miss
+            store_if: Optional predicate deciding whether a computed value is cached
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self._counters["coalesced"] += 1
+                owner = False
+            else:
+                future = Future()
+                self._inflight[key] = future
+                self._counters["misses"] += 1
+                owner = True
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+            if value is not None and (store_if is None or store_if(value)):
+                self.put(key, value)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.disk_dir:
+            for filename in os.listdir(self.disk_dir):
+                if filename.endswith(".json"):
+                    os.remove(os.path.join(self.disk_dir, filename))
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["memory_hits"] + self._counters["disk_hits"] + self._counters["misses"]
+            hits = self._counters["memory_hits"] + self._counters["disk_hits"]
+            return {
+                **self._counters,
+                "memory_entries": len(self._memory),
+                "inflight": len(self._inflight),
+                "hit_rate": hits / lookups if lookups else 0,
+                "disk_enabled": bool(self.disk_dir),
+            }
@@ -0,0 +1,246 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+
+def _read_text(path: str):
+    try:
+        with open(path, "r") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+# Distinguishes processes across reboots of the host (Linux only)
+_BOOT_ID = (_read_text("/proc/sys/kernel/random/boot_id") or "").strip()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def process_token(pid: int = None):
+    """
+    Identity of a running process, or None if it is gone: pid plus boot id
+    and start time where /proc is available, so a recycled pid (common in
+    containers, where the server is often pid 1) never matches an old owner.
+    """
+    pid = os.getpid() if pid is None else pid
+    if not os.path.isdir("/proc/self"):
+        return str(pid) if _pid_alive(pid) else None
+    stat = _read_text(f"/proc/{pid}/stat")
+    if stat is None:
+        return None
+    # Field 22 (start time); the command name in field 2 may contain spaces
+    started = stat.rsplit(")", 1)[1].split()[19]
+    return f"{pid}:{_BOOT_ID}:{started}"
+
+
+class JobStore:
+    """
+    SQLite-backed store for asynchronous analysis jobs.
+
+    The uploaded audio is kept in the row until the job finishes, so queued
+    jobs survive a restart. Each running job records the process that claimed
+    it (see process_token); on startup, only jobs whose process is gone, or
+    that were claimed by an earlier store in this same process, are put back
+    in the queue, so several worker processes can share one database (see
+    api/serve.py).
+    """
+
+    def __init__(self, db_path: str = "jobs.sqlite3"):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                filename TEXT,
+                audio BLOB,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                stages TEXT,
+                result TEXT,
+                error TEXT,
+                owner TEXT
+            )
+        """)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+        self.new_job = threading.Event()
+        self._token = process_token()
+        # No worker of a new store has claimed anything yet: jobs owned by
+        # this process belong to an earlier store whose workers are gone
+        requeued = self.requeue_orphans(include_own=True)
+        if requeued:
+            print(f"Re-queued {requeued} interrupted job(s)")
+
+    @staticmethod
+    def _owner_alive(owner) -> bool:
+        if not owner:
+            return False
+        pid = int(owner.split(":", 1)[0])
+        return process_token(pid) == owner
+
+    def requeue_orphans(self, include_own: bool = False) -> int:
+        """
+        Put running jobs whose owning process has exited back in the queue
+
+        Args:
+            include_own: Also re-queue jobs claimed by this process
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute("SELECT id, owner FROM jobs WHERE status = 'running'").fetchall()
+                orphans = [row["id"] for row in rows
+                           if (include_own and row["owner"] == self._token) or not self._owner_alive(row["owner"])]
+                for job_id in orphans:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'queued', started_at = NULL, owner = NULL WHERE id = ?",
+                        (job_id,),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if orphans:
+            self.new_job.set()
+        return len(orphans)
+
+    def create(self, data: bytes, filename: str = None) -> str:
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, filename, audio, created_at) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, filename, sqlite3.Binary(data), time.time()),
+            )
+        self.new_job.set()
+        return job_id
+
+    def claim_next(self):
+        """Atomically move the oldest queued job to running; returns (id, audio) or None"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, audio FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, owner = ? WHERE id = ?",
+                    (time.time(), self._token, row["id"]),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row["id"], bytes(row["audio"])
+
+    def finish(self, job_id: str, result: dict = None, stages: dict = None, error: str = None):
+        status = "failed" if error else "done"
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, stages = ?, result = ?, error = ?, audio = NULL "
+                "WHERE id = ?",
+                (status, time.time(), json.dumps(stages or {}),
+                 json.dumps(result, ensure_ascii=False) if result is not None else None, error, job_id),
+            )
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, filename, created_at, started_at, finished_at, stages, result, error "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = {
+            "job_id": row["id"],
+            "status": row["status"],
+            "filename": row["filename"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "queue_seconds": (row["started_at"] - row["created_at"]) if row["started_at"] else None,
+            "run_seconds": (row["finished_at"] - row["started_at"])
+            if row["finished_at"] and row["started_at"] else None,
+            "stages": json.loads(row["stages"]) if row["stages"] else {},
+        }
+        if row["result"] is not None:
+            job["result"] = json.loads(row["result"])
+        if row["error"]:
+            job["error"] = row["error"]
+        return job
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobWorkers:
+    """
+    Background threads that pull queued jobs from the store and run them.
+
+    run_fn receives the job's audio bytes and returns (result, stage_seconds).
+    """
+
+    def __init__(self, store: JobStore, run_fn, num_workers: int = 1, poll_seconds: float = 1.0):
+        self.store = store
+        self.run_fn = run_fn
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+            for i in range(max(1, num_workers))
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            claimed = self.store.claim_next()
+            if claimed is None:
+                self.store.new_job.wait(self.poll_seconds)
+                self.store.new_job.clear()
+                continue
+            job_id, data = claimed
+            try:
+                result, stages = self.run_fn(data)
+                self.store.finish(job_id, result=result, stages=stages)
+            except Exception as e:
+                self.store.finish(job_id, error=f"Error processing file: {str(e)}")
+
+    def stop(self):
+        self._stop.set()
+        self.store.new_job.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
@@ -0,0 +1,29 @@
+import os
+
+# Fields of /proc/<pid>/smaps_rollup, reported in bytes
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def process_memory(pid=None) -> dict:
+    """
+    Resident memory of a process split into shared and private pages (Linux).
+    Pages inherited from a forking parent and never written to stay shared,
+    so private_bytes is what each additional worker really costs.
+
+    Returns:
+        Dict with pid, rss/pss/shared_*/private_* in bytes and private_bytes,
+        or just the pid where /proc is not available
+    """
+    pid = pid or os.getpid()
+    stats = {"pid": pid}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in SMAPS_FIELDS:
+                    stats[f"{key.lower()}_bytes"] = int(value.split()[0]) * 1024
+    except (OSError, ValueError):
+        return stats
+    stats["private_bytes"] = stats.get("private_clean_bytes", 0) + stats.get("private_dirty_bytes", 0)
+    stats["shared_bytes"] = stats.get("shared_clean_bytes", 0) + stats.get("shared_dirty_bytes", 0)
+    return stats
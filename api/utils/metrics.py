@@ -0,0 +1,131 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds (covers ms-level text analysis up to long generate calls)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DURATION_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+RATIO_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+RTF_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    items = ",".join(f'{key}="{str(value)}"' for key, value in sorted(labels.items()))
+    return "{" + items + "}"
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram, optionally split by labels"""
+
+    def __init__(self, name: str, help_text: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                labels = dict(key)
+                for bound, count in zip(self.buckets, series["counts"]):
+                    lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {series['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {series['count']}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose value is read from a callback at scrape time"""
+
+    def __init__(self, name: str, help_text: str, read_fn):
+        self.name = name
+        self.help_text = help_text
+        self.read_fn = read_fn
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self.read_fn()
+        except Exception:
+            return []
+        if isinstance(value, dict):
+            for labels, item in value.items():
+                lines.append(f"{self.name}{_format_labels(dict(labels))} {item}")
+        else:
+            lines.append(f"{self.name} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Per-stage latency of the analysis pipeline. stage is one of: decode,
+# preprocess_<step> (high_pass, noise_reduction, trim, enhancement,
+# normalize, low_pass), feature_extraction, encode, generate,
+# generate_retry, find_disfluencies
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "analyzer_stage_seconds", "Latency of each analysis pipeline stage in seconds"))
+AUDIO_DURATION_SECONDS = REGISTRY.register(Histogram(
+    "analyzer_audio_duration_seconds", "Duration of analyzed audio in seconds", DURATION_BUCKETS))
+REAL_TIME_FACTOR = REGISTRY.register(Histogram(
+    "analyzer_real_time_factor", "Processing time divided by audio duration", RTF_BUCKETS))
+# Share of assistant-drafted tokens accepted by the main model (speculative decoding)
+SPECULATIVE_ACCEPTANCE = REGISTRY.register(Histogram(
+    "analyzer_speculative_acceptance_rate", "Estimated draft token acceptance rate per clip", RATIO_BUCKETS))
+# Latency added by empty-transcript fallback decodes, by strategy
+RETRY_SECONDS = REGISTRY.register(Histogram(
+    "analyzer_fallback_retry_seconds", "Latency added by empty-transcript fallback decodes"))
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    with STAGE_SECONDS.time(stage=stage):
+        yield
@@ -0,0 +1,303 @@
+import subprocess
+import threading
+
+import numpy as np
+import scipy.signal
+
+from api.utils.audio_io import TARGET_SR
+
+
+class PCMDecoder:
+    """
+    Raw PCM chunks (pcm16 little-endian or float32) to float32 samples.
+
+    Other sampling rates go through a stateful soxr stream, so the filter
+    history is carried across chunks and there are no boundary artifacts.
+    """
+
+    def __init__(self, sample_format: str = "pcm16", sample_rate: int = TARGET_SR):
+        if sample_format not in ("pcm16", "f32"):
+            raise ValueError(f"Unsupported PCM format: {sample_format}")
+        self.sample_format = sample_format
+        self.sample_rate = sample_rate
+        self._remainder = b""
+        self._resampler = None
+        if sample_rate != TARGET_SR:
+            import soxr
+            self._resampler = soxr.ResampleStream(sample_rate, TARGET_SR, 1, dtype="float32", quality="HQ")
+
+    def feed(self, data: bytes, final: bool = False) -> np.ndarray:
+        data = self._remainder + data
+        width = 2 if self.sample_format == "pcm16" else 4
+        usable = len(data) - len(data) % width
+        self._remainder = data[usable:]
+        if self.sample_format == "pcm16":
+            audio = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+        else:
+            audio = np.frombuffer(data[:usable], dtype="<f4").astype(np.float32)
+        if self._resampler is not None:
+            audio = self._resampler.resample_chunk(audio, last=final).astype(np.float32, copy=False)
+        return audio
+
+    def close(self):
+        pass
+
+
+class ContainerDecoder:
+    """
+    Encoded chunks (webm/ogg Opus from MediaRecorder) to float32 samples.
+
+    MediaRecorder chunks are not independently decodable, so one ffmpeg
+    process per session reads the container from stdin and a reader thread
+    collects the PCM it writes to stdout. Each chunk is decoded once.
+    """
+
+    def __init__(self):
+        self._process = None
+        self._reader = None
+        self._lock = threading.Lock()
+        self._decoded = []
+
+    def _start(self):
+        command = [
+            "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error",
+            # Start decoding as soon as the header is in instead of probing seconds of input
+            "-probesize", "4096", "-analyzeduration", "0", "-fflags", "nobuffer",
+            "-i", "pipe:0",
+            "-f", "f32le", "-acodec", "pcm_f32le",
+            "-ac", "1", "-ar", str(TARGET_SR),
+            "-flush_packets", "1",
+            "pipe:1",
+        ]
+        try:
+            self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                             stderr=subprocess.DEVNULL)
+        except FileNotFoundError:
+            raise ValueError("ffmpeg is required to decode webm/ogg streams")
+        self._reader = threading.Thread(target=self._read, name="ffmpeg-reader", daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        remainder = b""
+        while True:
+            data = self._process.stdout.read1(65536)
+            if not data:
+                break
+            data = remainder + data
+            usable = len(data) - len(data) % 4
+            remainder = data[usable:]
+            with self._lock:
+                self._decoded.append(np.frombuffer(data[:usable], dtype="<f4").copy())
+
+    def _take(self) -> np.ndarray:
+        with self._lock:
+            decoded, self._decoded = self._decoded, []
+        if not decoded:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(decoded)
+
+    def feed(self, data: bytes, final: bool = False) -> np.ndarray:
+        if self._process is None:
+            self._start()
+        if data and self._process.stdin is not None:
+            try:
+                self._process.stdin.write(data)
+                self._process.stdin.flush()
+            except (BrokenPipeError, OSError):
+                # ffmpeg gave up on the stream; keep what it decoded so far
+                pass
+        if final:
+            self.close(wait=True)
+        return self._take()
+
+    def close(self, wait: bool = False):
+        """End the ffmpeg process; with wait=True let it drain its output first"""
+        if self._process is None or self._process.returncode is not None:
+            return
+        try:
+            self._process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        if not wait:
+            self._process.kill()
+        self._process.wait()
+        self._reader.join()
+
+
+class StreamingPreprocessor:
+    """
+    Incremental preprocessing: running DC removal and a causal 80 Hz
+    high-pass whose filter state is carried across chunks.
+    """
+
+    def __init__(self, sr: int = TARGET_SR, cutoff: int = 80, dc_alpha: float = 0.999):
+        self.sos = scipy.signal.butter(4, cutoff, btype="high", fs=sr, output="sos")
+        self._zi = np.zeros((self.sos.shape[0], 2))
+        self._dc = 0.0
+        self.dc_alpha = dc_alpha
+
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        if not len(audio):
+            return audio
+        # One-pole running mean for the DC estimate
+        self._dc = self.dc_alpha * self._dc + (1.0 - self.dc_alpha) * float(np.mean(audio))
+        audio = audio - self._dc
+        filtered, self._zi = scipy.signal.sosfilt(self.sos, audio, zi=self._zi)
+        return filtered.astype(np.float32)
+
+
+class EnergyVAD:
+    """
+    Frame-energy voice activity detector with an adaptive noise floor.
+
+    feed() returns the list of completed utterances (float32 arrays) found
+    in the audio received so far.
+    """
+
+    def __init__(self, sr: int = TARGET_SR, frame_ms: int = 30, threshold_db: float = 12.0,
+                 min_level_db: float = -50.0, hangover_ms: int = 600, preroll_ms: int = 200,
+                 min_speech_ms: int = 150, max_utterance_s: float = 30.0):
+        """
+        Args:
+            sr: Sampling rate
+            frame_ms: Analysis frame length
+            threshold_db: Level above the noise floor that counts as speech
+            min_level_db: Absolute level (dBFS) below which frames are never speech
+            hangover_ms: Silence needed after speech to end an utterance
+            preroll_ms: Audio kept before the first speech frame
+            min_speech_ms: Shorter bursts are discarded as clicks
+            max_utterance_s: Utterances are cut at this length (Whisper's window)
+        """
+        self.sr = sr
+        self.frame = int(sr * frame_ms / 1000)
+        self.threshold_db = threshold_db
+        self.min_level_db = min_level_db
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.preroll_frames = max(0, preroll_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_frames = int(max_utterance_s * 1000 / frame_ms)
+        self.noise_floor_db = None
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._preroll = []
+        self._utterance = []
+        self._speech_frames = 0
+        self._silence_frames = 0
+        self.in_speech = False
+
+    def _level_db(self, frame: np.ndarray) -> float:
+        rms = np.sqrt(np.mean(frame.astype(np.float64) ** 2))
+        return 20.0 * np.log10(max(rms, 1e-10))
+
+    def _is_speech(self, level_db: float) -> bool:
+        if self.noise_floor_db is None:
+            self.noise_floor_db = level_db
+        speech = level_db > self.min_level_db and level_db > self.noise_floor_db + self.threshold_db
+        if not speech:
+            # Follow the floor down quickly and up slowly
+            rate = 0.2 if level_db < self.noise_floor_db else 0.02
+            self.noise_floor_db += rate * (level_db - self.noise_floor_db)
+        return speech
+
+    def _finish(self):
+        utterance = None
+        if self._speech_frames >= self.min_speech_frames:
+            utterance = np.concatenate(self._utterance)
+        self._utterance = []
+        self._speech_frames = 0
+        self._silence_frames = 0
+        self.in_speech = False
+        return utterance
+
+    def current_utterance(self) -> np.ndarray:
+        """Audio of the utterance in progress (for partial transcripts)"""
+        if not self._utterance:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(self._utterance)
+
+    def feed(self, audio: np.ndarray) -> list:
+        finished = []
+        self._pending = np.concatenate([self._pending, audio])
+        n_frames = len(self._pending) // self.frame
+        for i in range(n_frames):
+            frame = self._pending[i * self.frame:(i + 1) * self.frame]
+            speech = self._is_speech(self._level_db(frame))
+            if not self.in_speech:
+                if speech:
+                    self.in_speech = True
+                    self._utterance = self._preroll + [frame]
+                    self._preroll = []
+                    self._speech_frames = 1
+                else:
+                    self._preroll.append(frame)
+                    if len(self._preroll) > self.preroll_frames:
+                        self._preroll.pop(0)
+                continue
+            self._utterance.append(frame)
+            if speech:
+                self._speech_frames += 1
+                self._silence_frames = 0
+            else:
+                self._silence_frames += 1
+            if self._silence_frames >= self.hangover_frames or len(self._utterance) >= self.max_frames:
+                utterance = self._finish()
+                if utterance is not None:
+                    finished.append(utterance)
+        self._pending = self._pending[n_frames * self.frame:]
+        return finished
+
+    def flush(self) -> list:
+        """End of stream: return the utterance in progress, if any"""
+        if self.in_speech:
+            if len(self._pending):
+                self._utterance.append(self._pending)
+            self._pending = np.zeros(0, dtype=np.float32)
+            utterance = self._finish()
+            return [utterance] if utterance is not None else []
+        return []
+
+
+class StreamingSession:
+    """
+    Per-connection state for streaming transcription: decoder, incremental
+    preprocessing and VAD.
+    """
+
+    def __init__(self, sample_format: str = "pcm16", sample_rate: int = TARGET_SR,
+                 partial_interval_s: float = 1.0):
+        """
+        Args:
+            sample_format: "pcm16", "f32", or an encoded container ("webm", "ogg", "opus")
+            sample_rate: Sampling rate of raw PCM input
+            partial_interval_s: Seconds of new speech between partial transcripts (0 disables)
+        """
+        if sample_format in ("pcm16", "f32"):
+            self.decoder = PCMDecoder(sample_format, sample_rate)
+        else:
+            self.decoder = ContainerDecoder()
+        self.preprocessor = StreamingPreprocessor()
+        self.vad = EnergyVAD()
+        self.partial_samples = int(partial_interval_s * TARGET_SR)
+        self._last_partial_at = 0
+
+    def feed(self, data: bytes, final: bool = False):
+        """
+        Add a chunk; returns (finished_utterances, partial_audio_or_None)
+        """
+        audio = self.decoder.feed(data, final=final)
+        utterances = self.vad.feed(self.preprocessor.process(audio))
+        if final:
+            utterances += self.vad.flush()
+        if utterances:
+            self._last_partial_at = 0
+
+        partial = None
+        if self.partial_samples and self.vad.in_speech:
+            current = self.vad.current_utterance()
+            if len(current) - self._last_partial_at >= self.partial_samples:
+                self._last_partial_at = len(current)
+                partial = current
+        return utterances, partial
+
+    def close(self):
+        """Release the decoder (stops ffmpeg for container streams)"""
+        self.decoder.close()
@@ -0,0 +1,156 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+class PoolSaturated(Exception):
+    """Raised when the worker pool queue is full"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Worker pool is saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _init_process(ready, initializer, initargs):
+    """Run the pool's initializer in a worker process and report to the parent"""
+    try:
+        if initializer is not None:
+            initializer(*initargs)
+    except BaseException as e:
+        ready.put((os.getpid(), f"{type(e).__name__}: {e}"))
+        raise
+    ready.put((os.getpid(), None))
+
+
+def _noop():
+    return None
+
+
+class BoundedWorkerPool:
+    """
+    Thread or process pool with a bounded queue for CPU-bound analysis.
+
+    At most max_workers jobs run at once and at most max_queue more may wait.
+    Submitting beyond that raises PoolSaturated instead of piling up work, so
+    the API can answer with a Retry-After header.
+
+    Worker processes are spawned, not forked: a fork would copy the parent
+    without its scheduler threads and hang on the first batched request.
+    Each process builds its own state through initializer, so its models,
+    cache and metrics are not visible from the parent; wait_ready() blocks
+    until every process has finished its initializer.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 32, mode: str = "thread", retry_after: int = 5,
+                 initializer=None, initargs=()):
+        """
+        Args:
+            max_workers: Number of worker threads or processes
+            max_queue: Number of jobs allowed to wait for a free worker
+            mode: "thread" or "process"
+            retry_after: Seconds suggested to clients when the pool is full
+            initializer: Called with initargs once in every worker process (process mode only)
+            initargs: Arguments for initializer
+        """
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown worker mode: {mode}")
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.mode = mode
+        self.retry_after = retry_after
+        self._ready = None
+        if mode == "process":
+            context = multiprocessing.get_context("spawn")
+            self._ready = context.Queue()
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context,
+                                                 initializer=_init_process,
+                                                 initargs=(self._ready, initializer, initargs))
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="analyzer")
+        # Jobs wait here (counted as queued) until a worker slot is free
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._busy_seconds = 0.0
+        self._completed = 0
+        self._rejected = 0
+        self._started_at = time.perf_counter()
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending + self._running >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise PoolSaturated(self.retry_after)
+            self._pending += 1
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the pool and await its result"""
+        self._acquire()
+        loop = asyncio.get_running_loop()
+        started = None
+        try:
+            async with self._slots:
+                with self._lock:
+                    self._pending -= 1
+                    self._running += 1
+                started = time.perf_counter()
+                return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                if started is None:
+                    self._pending -= 1
+                else:
+                    self._running -= 1
+                    self._busy_seconds += time.perf_counter() - started
+                    self._completed += 1
+
+    def submit(self, fn, *args):
+        """
+        Submit fn(*args) from a background thread (e.g. the job workers) and
+        return a concurrent Future. Such jobs bypass the bounded queue.
+        """
+        return self._executor.submit(fn, *args)
+
+    def wait_ready(self, timeout: float = None):
+        """
+        Start the worker processes and wait until each one has run its
+        initializer (no-op in thread mode). Raises RuntimeError if one failed
+        and TimeoutError if they are not all ready in time.
+        """
+        if self._ready is None:
+            return
+        # Spawned pools start a process per submit while none is idle
+        for _ in range(self.max_workers):
+            self._executor.submit(_noop)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for _ in range(self.max_workers):
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                pid, error = self._ready.get(timeout=remaining)
+            except queue.Empty:
+                raise TimeoutError("Worker processes did not finish initializing in time")
+            if error is not None:
+                raise RuntimeError(f"Worker process {pid} failed to initialize: {error}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            elapsed = time.perf_counter() - self._started_at
+            return {
+                "mode": self.mode,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._pending,
+                "running": self._running,
+                "utilization": self._running / self.max_workers,
+                "average_utilization": self._busy_seconds / (elapsed * self.max_workers) if elapsed > 0 else 0,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import numpy as np
+
+from api.utils.cache import ResultCache, make_cache_key
+
+
+def test_concurrent_misses_compute_once():
+    cache = ResultCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"text": "casa"}
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(cache.get_or_compute("key", compute)))
+    owner.start()
+    assert started.wait(5)
+    waiters = [threading.Thread(target=lambda: results.append(cache.get_or_compute("key", compute)))
+               for _ in range(3)]
+    for thread in waiters:
+        thread.start()
+    # Let the waiters reach the in-flight future before the computation ends
+    deadline = time.monotonic() + 5
+    while cache.stats()["coalesced"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in [owner] + waiters:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [{"text": "casa"}] * 4
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["coalesced"] == 3
+    assert stats["inflight"] == 0
+    assert cache.get("key") == {"text": "casa"}
+
+
+def test_errors_reach_coalesced_callers_and_are_not_cached():
+    cache = ResultCache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def compute():
+        started.set()
+        release.wait(5)
+        raise ValueError("decode failed")
+
+    errors = []
+
+    def call():
+        try:
+            cache.get_or_compute("key", compute)
+        except ValueError as e:
+            errors.append(str(e))
+
+    owner = threading.Thread(target=call)
+    owner.start()
+    assert started.wait(5)
+    waiter = threading.Thread(target=call)
+    waiter.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()["coalesced"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+
+    assert errors == ["decode failed"] * 2
+    assert cache.get("key") is None
+    assert cache.get_or_compute("key", lambda: {"text": "casa"}) == {"text": "casa"}
+
+
+def test_store_if_skips_caching():
+    cache = ResultCache()
+    assert cache.get_or_compute("key", lambda: {"error": "x"}, store_if=lambda v: "error" not in v) == {"error": "x"}
+    assert cache.get("key") is None
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    ResultCache(disk_dir=str(tmp_path)).put("key", {"text": "casa"})
+    cache = ResultCache(disk_dir=str(tmp_path))
+    assert cache.get("key") == {"text": "casa"}
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_cache_key_depends_on_audio_and_settings():
+    audio = np.zeros(160, dtype=np.float32)
+    key = make_cache_key(audio, model="finetuned")
+    assert key == make_cache_key(audio.copy(), model="finetuned")
+    assert key != make_cache_key(audio, model="base")
+    assert key != make_cache_key(audio + 0.1, model="finetuned")
@@ -0,0 +1,72 @@
+import subprocess
+import sys
+
+from api.utils.jobs import JobStore, process_token
+
+
+def _running_job(store: JobStore, owner: str) -> str:
+    job_id = store.create(b"audio", "clip.wav")
+    assert store.claim_next()[0] == job_id
+    store._conn.execute("UPDATE jobs SET owner = ? WHERE id = ?", (owner, job_id))
+    return job_id
+
+
+def _dead_token() -> str:
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        token = process_token(child.pid)
+    finally:
+        child.kill()
+        child.wait()
+    return token
+
+
+def test_jobs_of_an_exited_process_are_requeued(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = _running_job(store, _dead_token())
+    assert store.requeue_orphans() == 1
+    assert store.get(job_id)["status"] == "queued"
+    assert store.claim_next()[0] == job_id
+
+
+def test_recycled_pid_does_not_keep_a_job_running(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    # Same pid as a live process, but a different start time
+    pid = process_token().split(":", 1)[0]
+    job_id = _running_job(store, f"{pid}:old-boot:0")
+    assert store.requeue_orphans() == 1
+    assert store.get(job_id)["status"] == "queued"
+
+
+def test_jobs_of_a_live_process_stay_running(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        job_id = _running_job(store, process_token(child.pid))
+        assert store.requeue_orphans() == 0
+        assert JobStore(path).get(job_id)["status"] == "running"
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_new_store_requeues_jobs_of_this_process(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    job_id = store.create(b"audio")
+    store.claim_next()
+    assert store.requeue_orphans() == 0
+    reopened = JobStore(path)
+    assert reopened.get(job_id)["status"] == "queued"
+
+
+def test_finished_jobs_drop_their_audio(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.create(b"audio")
+    store.claim_next()
+    store.finish(job_id, result={"text": "casa"}, stages={"decode": 0.1})
+    job = store.get(job_id)
+    assert job["status"] == "done"
+    assert job["result"] == {"text": "casa"}
+    assert store._conn.execute("SELECT audio FROM jobs WHERE id = ?", (job_id,)).fetchone()["audio"] is None
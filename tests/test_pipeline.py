@@ -0,0 +1,33 @@
+import numpy as np
+
+from api.model import pipeline as pipeline_module
+from api.model.pipeline import SpeechPipeline
+from api.utils.cache import ResultCache
+from api.utils.metrics import REAL_TIME_FACTOR
+
+
+def _rtf_count() -> int:
+    series = REAL_TIME_FACTOR._series.get((), {"count": 0})
+    return series["count"]
+
+
+def test_cache_hits_are_not_recorded_as_real_time_factor(monkeypatch):
+    calls = []
+
+    def analyze_audio(audio, base=False, targets=None):
+        calls.append(len(audio))
+        return {"text": "casa", "metrics": {"duration": len(audio) / 16000}}
+
+    monkeypatch.setattr(pipeline_module, "analyze_audio", analyze_audio)
+    monkeypatch.setattr(pipeline_module, "model_settings", lambda name: {"model": name})
+    pipeline = SpeechPipeline(preprocess=False, cache=ResultCache())
+    audio = np.zeros(16000, dtype=np.float32)
+
+    before = _rtf_count()
+    first, first_timings = pipeline.run_with_timings(audio)
+    second, second_timings = pipeline.run_with_timings(audio)
+
+    assert first == second
+    assert len(calls) == 1
+    assert _rtf_count() == before + 1
+    assert "analyze" in first_timings and "analyze" not in second_timings
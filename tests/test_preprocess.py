@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+import scipy.signal
+
+from trainer.utils.preprocess import AudioPreprocessor, butter_sos, filter_rows
+
+SR = 16000
+
+
+def _clip(n_samples: int, seed: int) -> np.ndarray:
+    """Syllable-like tone bursts (two per second) between pauses, over low noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / SR
+    syllables = (np.sin(2 * np.pi * 2 * t) > 0) & (t > 0.2) & (t < t[-1] - 0.15)
+    tone = 0.3 * np.sin(2 * np.pi * (200 + 50 * seed) * t) * syllables
+    return tone + 0.01 * rng.standard_normal(n_samples)
+
+
+def _stream(preprocessor, audio: np.ndarray, block_size: int, sr: int = SR) -> np.ndarray:
+    blocks = (audio[i:i + block_size] for i in range(0, len(audio), block_size))
+    return np.concatenate(list(preprocessor.process_stream(blocks, sr=sr)))
+
+
+def _rms(audio: np.ndarray) -> float:
+    return float(np.sqrt(np.mean(audio ** 2)))
+
+
+@pytest.fixture
+def preprocessor():
+    # The spectral method keeps the test independent of noisereduce
+    return AudioPreprocessor(noise_reduction_method="spectral", verbose=False)
+
+
+def test_filter_rows_matches_sosfiltfilt_per_row():
+    sos = butter_sos(4, 80, SR, "high")
+    rng = np.random.default_rng(0)
+    rows = [rng.standard_normal(n) for n in (16000, 4000, 700, 30)] + [np.zeros(900)]
+    lengths = np.array([len(row) for row in rows])
+    batch = np.zeros((len(rows), lengths.max()))
+    for i, row in enumerate(rows):
+        batch[i, :len(row)] = row
+    mask = np.arange(batch.shape[1])[None, :] < lengths[:, None]
+
+    filtered = filter_rows(sos, batch, mask)
+    for i, row in enumerate(rows):
+        np.testing.assert_allclose(filtered[i, :len(row)], scipy.signal.sosfiltfilt(sos, row), atol=1e-12)
+        assert not filtered[i, len(row):].any()
+
+
+def test_process_batch_matches_process_for_mixed_lengths(preprocessor):
+    clips = [_clip(n, seed) for seed, n in enumerate((8000, 48000, 20000, 33333, 12345))]
+    clips.append(np.zeros(16000))
+    batched = preprocessor.process_batch(clips, batch_size=4)
+    for clip, result in zip(clips, batched):
+        expected = preprocessor.process(clip)
+        assert result.dtype == np.float32
+        assert len(result) == len(expected)
+        np.testing.assert_allclose(result, expected, atol=1e-6)
+
+
+def test_process_stream_does_not_depend_on_block_size():
+    # The running normalizer adapts per block by design; every other stage carries its state exactly
+    preprocessor = AudioPreprocessor(noise_reduction_method="spectral", normalize_audio=False, verbose=False)
+    audio = _clip(5 * SR, 1)
+    reference = _stream(preprocessor, audio, 4000)
+    for block_size in (999, 32000):
+        np.testing.assert_allclose(_stream(preprocessor, audio, block_size), reference, atol=1e-6)
+
+
+@pytest.mark.parametrize("sr", [SR, 44100])
+def test_process_stream_matches_process_in_length_level_and_spectrum(preprocessor, sr):
+    audio = _clip(6 * SR, 1)
+    expected = preprocessor.process(audio)
+    if sr != SR:
+        audio = scipy.signal.resample_poly(audio, sr // 100, SR // 100)
+    streamed = _stream(preprocessor, audio, sr // 4, sr=sr)
+
+    # Trimming works on different frame grids: lengths agree to within 0.15 s
+    assert abs(len(streamed) - len(expected)) < 0.15 * SR
+    assert abs(20 * np.log10(_rms(streamed) / _rms(expected))) < 1.5
+    frequencies, expected_power = scipy.signal.welch(expected, SR, nperseg=1024)
+    _, streamed_power = scipy.signal.welch(streamed, SR, nperseg=1024)
+    assert frequencies[np.argmax(streamed_power)] == frequencies[np.argmax(expected_power)]
+    assert np.max(np.abs(streamed)) <= 0.98
+
+
+def test_silent_stream_stays_silent_and_whole(preprocessor):
+    silence = np.zeros(3 * SR)
+    streamed = _stream(preprocessor, silence, 4000)
+    np.testing.assert_array_equal(streamed, preprocessor.process(silence))
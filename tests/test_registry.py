@@ -0,0 +1,92 @@
+import pytest
+
+from api.model import registry as registry_module
+from api.model.registry import ModelRegistry
+
+MB = 1024 * 1024
+
+
+class FakeModel:
+    def __init__(self, source, size_bytes):
+        self.source = source
+        self.size_bytes = size_bytes
+
+
+class Loads(list):
+    """Sources loaded so far; .sizes sets the size of a source's model"""
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Replace model loading with fake models whose size is set per source"""
+    loaded = Loads()
+    sizes = {}
+
+    def load_whisper(source, backend, cache_dir):
+        loaded.append(source)
+        return FakeModel(source, sizes.get(source, 100 * MB)), "processor", "cpu", backend
+
+    monkeypatch.setattr(registry_module, "load_whisper", load_whisper)
+    monkeypatch.setattr(registry_module, "model_dtype", lambda model: None)
+    monkeypatch.setattr(registry_module, "_model_size_bytes", lambda model: model.size_bytes)
+    loaded.sizes = sizes
+    return loaded
+
+
+def test_get_loads_each_variant_once(loads):
+    registry = ModelRegistry({"a": "src-a"})
+    first = registry.get("a")
+    assert registry.get("a") is first
+    assert loads == ["src-a"]
+
+
+def test_unknown_variant(loads):
+    with pytest.raises(KeyError):
+        ModelRegistry({"a": "src-a"}).get("b")
+
+
+def test_evicts_least_recently_used_idle_variant(loads):
+    registry = ModelRegistry({"a": "src-a", "b": "src-b", "c": "src-c"}, memory_budget_bytes=250 * MB)
+    registry.get("a")
+    registry.get("b")
+    registry.get("a")  # "b" is now least recently used
+    registry.get("c")
+    assert [m["name"] for m in registry.stats()["loaded"]] == ["a", "c"]
+    assert registry.used_bytes() == 200 * MB
+
+
+def test_leased_variant_is_not_evicted(loads):
+    registry = ModelRegistry({"a": "src-a", "b": "src-b"}, memory_budget_bytes=150 * MB)
+    with registry.lease("a") as handle:
+        registry.get("b")
+        assert handle.model is not None
+        # Over budget, but "a" is in use
+        assert {m["name"] for m in registry.stats()["loaded"]} == {"a", "b"}
+
+
+def test_swap_replaces_the_variant(loads):
+    registry = ModelRegistry({"a": "src-a"})
+    old = registry.get("a")
+    new = registry.swap("a", "src-a2", warm_up_fn=lambda handle: None)
+    assert registry.get("a") is new
+    assert new.model.source == "src-a2"
+    assert registry.version("a") == 1
+    assert registry.variants["a"] == "src-a2"
+    # Nothing was using the old weights, so they are freed right away
+    assert old.model is None
+
+
+def test_failed_warm_up_rolls_back_the_swap(loads):
+    registry = ModelRegistry({"a": "src-a"})
+    old = registry.get("a")
+
+    def warm_up(handle):
+        raise RuntimeError("cannot decode")
+
+    with pytest.raises(RuntimeError):
+        registry.swap("a", "src-broken", warm_up_fn=warm_up)
+    assert registry.get("a") is old
+    assert old.model.source == "src-a"
+    assert registry.version("a") == 0
+    assert registry.variants["a"] == "src-a"
+    assert loads == ["src-a", "src-broken"]
@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from api.model.scheduler import BatchScheduler
+
+
+def test_concurrent_items_are_batched_in_order():
+    release = threading.Event()
+    batches = []
+
+    def batch_fn(items):
+        release.wait(5)
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    scheduler = BatchScheduler(batch_fn, max_batch_size=4, max_wait_ms=200)
+    try:
+        futures = [scheduler.submit(i) for i in range(6)]
+        release.set()
+        assert [f.result(timeout=5) for f in futures] == [0, 2, 4, 6, 8, 10]
+        assert all(len(batch) <= 4 for batch in batches)
+        assert sum(batches, []) == list(range(6))
+        assert scheduler.stats()["items"] == 6
+    finally:
+        scheduler.stop()
+
+
+def test_partial_batch_is_flushed_after_max_wait():
+    scheduler = BatchScheduler(lambda items: items, max_batch_size=8, max_wait_ms=10)
+    try:
+        assert scheduler("clip", timeout=5) == "clip"
+        assert scheduler.stats()["batch_size_counts"] == {1: 1}
+    finally:
+        scheduler.stop()
+
+
+def test_batch_errors_reach_every_caller():
+    def batch_fn(items):
+        raise ValueError("decode failed")
+
+    scheduler = BatchScheduler(batch_fn, max_batch_size=2, max_wait_ms=50)
+    try:
+        futures = [scheduler.submit(i) for i in range(2)]
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result(timeout=5)
+    finally:
+        scheduler.stop()
+
+
+def test_wrong_result_count_is_an_error():
+    scheduler = BatchScheduler(lambda items: [], max_batch_size=1, max_wait_ms=0)
+    try:
+        with pytest.raises(RuntimeError):
+            scheduler("clip", timeout=5)
+    finally:
+        scheduler.stop()
@@ -0,0 +1,126 @@
+import importlib.util
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Allow running as `python trainer/benchmark_enhancement.py` from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trainer.utils.preprocess import AudioPreprocessor, SpectralEnhancer
+
+# Noise reduction variants: AudioPreprocessor arguments for each
+METHODS = {
+    "noisereduce": {"noise_reduction_method": "noisereduce"},
+    "gate": {"noise_reduction_method": "spectral", "enhancement_chain": ("noise_floor", "gate")},
+    "wiener": {"noise_reduction_method": "spectral", "enhancement_chain": ("noise_floor", "wiener")},
+    "wiener_gate": {"noise_reduction_method": "spectral", "enhancement_chain": ("noise_floor", "wiener", "gate")},
+    "full_chain": {"noise_reduction_method": "spectral", "enhancement_chain": SpectralEnhancer.STEPS},
+}
+
+
+def load_clips(data_csv, preprocessor, limit):
+    """(name, 16 kHz audio, transcription) from the manifest, or synthetic noisy tones without a transcription"""
+    clips = []
+    if os.path.exists(data_csv):
+        for _, row in pd.read_csv(data_csv).head(limit).iterrows():
+            if os.path.exists(row['file_path']):
+                audio, sr = preprocessor.load_audio(row['file_path'])
+                clips.append((os.path.basename(row['file_path']), preprocessor.resample_audio(audio, sr),
+                              str(row['transcription'])))
+    if clips:
+        return clips
+    rng = np.random.default_rng(0)
+    t = np.arange(3 * preprocessor.target_sr) / preprocessor.target_sr
+    return [(f"tone_{f:.0f}hz", 0.3 * np.sin(2 * np.pi * f * t) + 0.05 * rng.standard_normal(len(t)), None)
+            for f in rng.uniform(150, 1000, limit)]
+
+
+def transcribe_all(model_path, audios):
+    """Greedy Spanish transcriptions of 16 kHz clips, one clip at a time"""
+    import torch
+    from api.model.backends import load_whisper, model_dtype
+
+    model, processor, device, _ = load_whisper(model_path)
+    dtype = model_dtype(model)
+    predictions = []
+    for audio in audios:
+        inputs = processor(audio, sampling_rate=16000, return_tensors="pt", return_attention_mask=True).to(device)
+        with torch.no_grad():
+            generated_ids = model.generate(
+                inputs.input_features.to(dtype),
+                attention_mask=inputs.attention_mask,
+                do_sample=False,
+                num_beams=1,
+                language="es",
+                task="transcribe",
+            )
+        predictions.append(processor.batch_decode(generated_ids, skip_special_tokens=True)[0].strip())
+    return predictions
+
+
+def benchmark_enhancement(model_path="outputs/whisper-finetuned", data_csv="data/cleaned_audio_data.csv",
+                          methods=tuple(METHODS), limit=50, repeats=3):
+    """
+    Compare noisereduce with the SpectralEnhancer chains: time of the noise
+    reduction step and of the whole preprocessing chain per clip, and
+    exact-match transcription accuracy after preprocessing (when the model
+    and the manifest are available).
+    """
+    print("Speech Issues Analyzer - Spectral Enhancement Benchmark")
+    print("=" * 60)
+
+    clips = load_clips(data_csv, AudioPreprocessor(verbose=False), limit)
+    with_accuracy = os.path.exists(model_path) and all(reference is not None for _, _, reference in clips)
+    if not with_accuracy:
+        print("Model or manifest not found: measuring speed only")
+    print(f"Clips: {len(clips)} ({np.mean([len(audio) for _, audio, _ in clips]) / 16000:.1f}s mean)")
+
+    if "noisereduce" in methods and importlib.util.find_spec("noisereduce") is None:
+        # apply_noise_reduction would silently fall back to a high-pass filter
+        print("noisereduce is not installed: skipping its row")
+        methods = [method for method in methods if method != "noisereduce"]
+
+    summary = []
+    for method in methods:
+        preprocessor = AudioPreprocessor(**METHODS[method], verbose=False)
+        step_seconds = 0.0
+        chain_seconds = 0.0
+        processed = []
+        for _, audio, _ in clips:
+            start = time.perf_counter()
+            for _ in range(repeats):
+                preprocessor.apply_noise_reduction(audio)
+            step_seconds += (time.perf_counter() - start) / repeats
+            start = time.perf_counter()
+            processed.append(preprocessor.process(audio, preprocessor.target_sr))
+            chain_seconds += time.perf_counter() - start
+
+        row = {
+            "method": method,
+            "noise_reduction_ms": round(1000 * step_seconds / len(clips), 2),
+            "preprocess_ms": round(1000 * chain_seconds / len(clips), 2),
+        }
+        if with_accuracy:
+            predictions = transcribe_all(model_path, processed)
+            row["accuracy"] = round(np.mean([
+                prediction.lower() == reference.strip().lower()
+                for prediction, (_, _, reference) in zip(predictions, clips)
+            ]), 4)
+        summary.append(row)
+        print(f"  {method}: done")
+
+    summary_df = pd.DataFrame(summary)
+    baseline = summary_df["noise_reduction_ms"].iloc[0]
+    summary_df["speedup"] = (baseline / summary_df["noise_reduction_ms"]).round(2)
+    print()
+    print(f"Speedup relative to {summary_df['method'].iloc[0]}")
+    print(summary_df.to_string(index=False))
+    summary_df.to_csv("enhancement_benchmark.csv", index=False)
+    print("\nReport saved to: enhancement_benchmark.csv")
+    return summary_df
+
+
+if __name__ == "__main__":
+    benchmark_enhancement()
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.signal
+
+# Allow running as `python trainer/benchmark_filters.py` from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trainer.utils.preprocess import AudioPreprocessor
+
+
+def legacy_filters(preprocessor, audio):
+    """Previous filter stages: butter redesigned per call, ba-form filtfilt, separate mix and gain passes"""
+    nyquist = preprocessor.target_sr // 2
+    b, a = scipy.signal.butter(4, 80 / nyquist, btype='high')
+    audio = scipy.signal.filtfilt(b, a, audio)
+    b, a = scipy.signal.butter(2, [300 / nyquist, 3400 / nyquist], btype='band')
+    audio = 0.6 * scipy.signal.filtfilt(b, a, audio) + 0.4 * audio
+    audio = preprocessor.apply_dynamic_range_compression(audio)
+    audio = audio * preprocessor.normalization_gain(audio)
+    b, a = scipy.signal.butter(4, 7500 / nyquist, btype='low')
+    return scipy.signal.filtfilt(b, a, audio)
+
+
+def compiled_filters(preprocessor, audio):
+    """Same stages on the cached SOS chain, with the mix and the gain fused into the filters"""
+    filters = preprocessor.filters
+    audio = scipy.signal.sosfiltfilt(filters.high_pass, audio)
+    audio = scipy.signal.sosfiltfilt(filters.speech, audio)
+    audio = preprocessor.apply_dynamic_range_compression(audio)
+    sos = filters.low_pass.copy()
+    sos[0, :3] *= np.sqrt(preprocessor.normalization_gain(audio))
+    return scipy.signal.sosfiltfilt(sos, audio)
+
+
+def load_clips(data_csv, preprocessor, limit):
+    """Clips from the manifest, or synthetic noisy tones when it is not available"""
+    if os.path.exists(data_csv):
+        clips = []
+        for _, row in pd.read_csv(data_csv).head(limit).iterrows():
+            if os.path.exists(row['file_path']):
+                audio, sr = preprocessor.load_audio(row['file_path'])
+                clips.append(preprocessor.resample_audio(audio, sr))
+        if clips:
+            return clips
+    rng = np.random.default_rng(0)
+    t = np.arange(5 * preprocessor.target_sr) / preprocessor.target_sr
+    return [0.3 * np.sin(2 * np.pi * f * t) + 0.05 * rng.standard_normal(len(t)) for f in rng.uniform(150, 1000, limit)]
+
+
+def benchmark_filters(data_csv="data/cleaned_audio_data.csv", limit=50, repeats=3):
+    """Per-clip time of the old and compiled filter stages and the numerical difference between them"""
+    print("Speech Issues Analyzer - Filter Chain Benchmark")
+    print("=" * 60)
+
+    preprocessor = AudioPreprocessor(verbose=False)
+    clips = load_clips(data_csv, preprocessor, limit)
+
+    results = []
+    for audio in clips:
+        row = {'seconds': len(audio) / preprocessor.target_sr}
+        for name, fn in (("legacy", legacy_filters), ("compiled", compiled_filters)):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                output = fn(preprocessor, audio)
+            row[f'{name}_ms'] = 1000 * (time.perf_counter() - start) / repeats
+            row[name] = output
+        diff = np.abs(row.pop('legacy') - row.pop('compiled'))
+        # The filters' start/end transients differ slightly; the rest is identical
+        edge = preprocessor.target_sr // 10
+        row['max_abs_diff'] = float(diff.max())
+        row['interior_max_abs_diff'] = float(diff[edge:-edge].max()) if len(diff) > 2 * edge else row['max_abs_diff']
+        results.append(row)
+
+    results_df = pd.DataFrame(results)
+    print(f"Clips: {len(results_df)} ({results_df['seconds'].mean():.1f}s mean)")
+    print(f"Legacy filters:   {results_df['legacy_ms'].mean():8.2f} ms/clip")
+    print(f"Compiled filters: {results_df['compiled_ms'].mean():8.2f} ms/clip")
+    print(f"Speedup: {results_df['legacy_ms'].sum() / results_df['compiled_ms'].sum():.2f}x")
+    print(f"Max abs difference: {results_df['max_abs_diff'].max():.2e} "
+          f"(excluding the first/last 100 ms: {results_df['interior_max_abs_diff'].max():.2e})")
+    return results_df
+
+
+if __name__ == "__main__":
+    benchmark_filters()
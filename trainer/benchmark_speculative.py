@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+
+import librosa
+import pandas as pd
+import torch
+from transformers import WhisperProcessor, WhisperForConditionalGeneration
+
+# Allow running as `python trainer/benchmark_speculative.py` from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api.model.speculative import assisted_generate
+
+
+def load_model(model_path, device):
+    model = WhisperForConditionalGeneration.from_pretrained(model_path).to(device)
+    model.eval()
+    return model
+
+
+def benchmark_speculative(model_path="outputs/whisper-finetuned", assistant_path="openai/whisper-tiny",
+                          data_csv="data/cleaned_audio_data.csv", limit=None):
+    """
+    Compare plain greedy decoding with speculative decoding on the manifest:
+    checks the outputs are identical and reports acceptance rate and speedup.
+    """
+    print("Speech Issues Analyzer - Speculative Decoding Benchmark")
+    print("=" * 60)
+
+    if not os.path.exists(data_csv):
+        print(f"Error: Data file not found at {data_csv}")
+        return None
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    processor = WhisperProcessor.from_pretrained(model_path)
+    model = load_model(model_path, device)
+    assistant = load_model(assistant_path, device)
+    print(f"Main model: {model_path}, assistant: {assistant_path}, device: {device}")
+
+    df = pd.read_csv(data_csv)
+    if limit:
+        df = df.head(limit)
+
+    generate_kwargs = {"do_sample": False, "num_beams": 1, "language": "es", "task": "transcribe"}
+    results = []
+    for _, row in df.iterrows():
+        audio_path = row['file_path']
+        if not os.path.exists(audio_path):
+            continue
+        audio, _ = librosa.load(audio_path, sr=16000)
+        inputs = processor(audio, sampling_rate=16000, return_tensors="pt", return_attention_mask=True).to(device)
+
+        start = time.perf_counter()
+        with torch.no_grad():
+            greedy_ids = model.generate(inputs.input_features, attention_mask=inputs.attention_mask, **generate_kwargs)
+        greedy_seconds = time.perf_counter() - start
+
+        assisted_ids, stats = assisted_generate(model, assistant, inputs.input_features, inputs.attention_mask,
+                                                **generate_kwargs)
+        greedy_text = processor.batch_decode(greedy_ids, skip_special_tokens=True)[0].strip()
+        assisted_text = processor.batch_decode(assisted_ids, skip_special_tokens=True)[0].strip()
+
+        results.append({
+            'audio_file': os.path.basename(audio_path),
+            'greedy_transcription': greedy_text,
+            'assisted_transcription': assisted_text,
+            'identical': greedy_text == assisted_text,
+            'greedy_ms': 1000 * greedy_seconds,
+            'assisted_ms': 1000 * stats["seconds"],
+            'acceptance_rate': stats["acceptance_rate"],
+        })
+        print(f"{os.path.basename(audio_path)}: {1000 * greedy_seconds:.0f} ms -> "
+              f"{1000 * stats['seconds']:.0f} ms, acceptance {stats['acceptance_rate']:.0%}")
+
+    if not results:
+        print("No audio files found")
+        return None
+
+    results_df = pd.DataFrame(results)
+    print("=" * 60)
+    print(f"Identical outputs: {results_df['identical'].mean():.2%} ({int(results_df['identical'].sum())}/{len(results_df)})")
+    print(f"Mean acceptance rate: {results_df['acceptance_rate'].mean():.2%}")
+    print(f"Speedup: {results_df['greedy_ms'].sum() / results_df['assisted_ms'].sum():.2f}x")
+    results_df.to_csv('speculative_results.csv', index=False)
+    print("Detailed results saved to: speculative_results.csv")
+    return results_df
+
+
+if __name__ == "__main__":
+    benchmark_speculative()
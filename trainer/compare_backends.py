@@ -0,0 +1,152 @@
+import os
+import queue
+import sys
+import time
+import multiprocessing as mp
+
+import librosa
+import pandas as pd
+import torch
+
+# Allow running as `python trainer/compare_backends.py` from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api.model.backends import load_whisper, model_dtype, BACKENDS
+
+
+def _rss_mb() -> float:
+    """Resident set size of this process in MB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _evaluate_backend(model_path, backend, rows, batch_size, results):
+    """Runs in a fresh process so RSS is measured per backend; always reports back"""
+    try:
+        results.put(_run_backend(model_path, backend, rows, batch_size))
+    except Exception as e:
+        results.put({"requested_backend": backend, "error": f"{type(e).__name__}: {e}"})
+
+
+def _run_backend(model_path, backend, rows, batch_size) -> dict:
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    model, processor, device, used_backend = load_whisper(model_path, backend)
+    load_seconds = time.perf_counter() - start
+    dtype = model_dtype(model)
+
+    audios = [librosa.load(path, sr=16000)[0] for path, _ in rows]
+    predictions = []
+    latencies = []
+    total_start = time.perf_counter()
+    for i in range(0, len(audios), batch_size):
+        batch = audios[i:i + batch_size]
+        inputs = processor(batch, sampling_rate=16000, return_tensors="pt", return_attention_mask=True).to(device)
+        batch_start = time.perf_counter()
+        with torch.no_grad():
+            generated_ids = model.generate(
+                inputs.input_features.to(dtype),
+                attention_mask=inputs.attention_mask,
+                do_sample=False,
+                num_beams=1,
+                language="es",
+                task="transcribe",
+            )
+        latencies.append((time.perf_counter() - batch_start) / len(batch))
+        predictions.extend(t.strip() for t in processor.batch_decode(generated_ids, skip_special_tokens=True))
+    total_seconds = time.perf_counter() - total_start
+
+    correct = sum(
+        1 for prediction, (_, expected) in zip(predictions, rows)
+        if prediction.lower() == str(expected).strip().lower()
+    )
+    return {
+        "backend": used_backend,
+        "requested_backend": backend,
+        "load_seconds": load_seconds,
+        "mean_latency_ms": 1000 * sum(latencies) / len(latencies) if latencies else 0,
+        "throughput_clips_per_s": len(predictions) / total_seconds if total_seconds > 0 else 0,
+        "rss_mb": _rss_mb() - rss_before,
+        "accuracy": correct / len(rows) if rows else 0,
+        "predictions": predictions,
+    }
+
+
+def _wait_for_report(process, results, backend) -> dict:
+    """Get the child's report, or an error record if it died without one (e.g. OOM)"""
+    while True:
+        try:
+            return results.get(timeout=5)
+        except queue.Empty:
+            if not process.is_alive():
+                return {"requested_backend": backend, "error": f"worker exited with code {process.exitcode}"}
+
+
+def compare_backends(model_path="outputs/whisper-finetuned", data_csv="data/cleaned_audio_data.csv",
+                     backends=BACKENDS, limit=None, batch_size=1):
+    """
+    Compare inference backends against fp32 on the CSV manifest: latency,
+    throughput, RSS, exact-match accuracy and agreement with fp32 output.
+    """
+    print("Speech Issues Analyzer - Inference Backend Comparison")
+    print("=" * 60)
+
+    if not os.path.exists(data_csv):
+        print(f"Error: Data file not found at {data_csv}")
+        return None
+
+    df = pd.read_csv(data_csv)
+    if limit:
+        df = df.head(limit)
+    rows = [(row['file_path'], row['transcription']) for _, row in df.iterrows() if os.path.exists(row['file_path'])]
+    print(f"Evaluating {len(rows)} audio files with backends: {', '.join(backends)}")
+
+    context = mp.get_context("spawn")
+    reports = []
+    for backend in backends:
+        results = context.Queue()
+        process = context.Process(target=_evaluate_backend, args=(model_path, backend, rows, batch_size, results))
+        process.start()
+        report = _wait_for_report(process, results, backend)
+        process.join()
+        if "error" in report:
+            # e.g. optimum is not installed for "onnx", or the export failed
+            print(f"  {backend}: skipped ({report['error']})")
+            continue
+        reports.append(report)
+        print(f"  {backend}: done ({report['backend']})")
+
+    reference = next((r for r in reports if r["backend"] == "fp32"), None)
+    summary = []
+    for report in reports:
+        agreement = None
+        if reference is not None:
+            same = sum(1 for a, b in zip(report["predictions"], reference["predictions"]) if a == b)
+            agreement = same / len(rows) if rows else 0
+        summary.append({
+            "backend": report["requested_backend"],
+            "used": report["backend"],
+            "load_s": round(report["load_seconds"], 2),
+            "latency_ms": round(report["mean_latency_ms"], 1),
+            "clips_per_s": round(report["throughput_clips_per_s"], 2),
+            "rss_mb": round(report["rss_mb"], 0),
+            "accuracy": round(report["accuracy"], 4),
+            "agreement_with_fp32": round(agreement, 4) if agreement is not None else None,
+        })
+
+    summary_df = pd.DataFrame(summary)
+    print()
+    print(summary_df.to_string(index=False))
+    summary_df.to_csv("backend_comparison.csv", index=False)
+    print("\nReport saved to: backend_comparison.csv")
+    return summary_df
+
+
+if __name__ == "__main__":
+    compare_backends()
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+
+try:
+    from optimum.exporters.onnx import main_export
+    OPTIMUM_AVAILABLE = True
+except ImportError:
+    OPTIMUM_AVAILABLE = False
+    print("Warning: optimum is not installed. Install with: pip install optimum[onnxruntime]")
+from transformers import WhisperProcessor
+
+# Allow running as `python trainer/export_onnx.py` from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api.model.backends import onnx_dir_for
+
+
+def export_onnx(model_path="outputs/whisper-finetuned", output_dir=None):
+    """
+    Export a Whisper checkpoint to ONNX: an encoder graph and a decoder graph
+    that takes past key/values, so generation reuses the KV cache.
+    """
+    if not OPTIMUM_AVAILABLE:
+        return None
+    if not os.path.exists(model_path) and "/" not in model_path:
+        print(f"Error: Model not found at {model_path}")
+        return None
+    output_dir = output_dir or onnx_dir_for(model_path)
+
+    print(f"Exporting {model_path} to ONNX in {output_dir}...")
+    start = time.perf_counter()
+    main_export(
+        model_path,
+        output=output_dir,
+        task="automatic-speech-recognition-with-past",
+        opset=17,
+        device="cpu",
+    )
+    # Keep the processor next to the graphs
+    WhisperProcessor.from_pretrained(model_path).save_pretrained(output_dir)
+    print(f"Export finished in {time.perf_counter() - start:.1f}s")
+
+    for filename in sorted(os.listdir(output_dir)):
+        if filename.endswith(".onnx"):
+            size = os.path.getsize(os.path.join(output_dir, filename)) / 1e6
+            print(f"  {filename}: {size:.0f} MB")
+    print("Serve it with ANALYZER_BACKEND=onnx")
+    return output_dir
+
+
+if __name__ == "__main__":
+    # Usage: python trainer/export_onnx.py [model_path] [output_dir]
+    export_onnx(*sys.argv[1:3])
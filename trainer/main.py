@@ -1,5 +1,6 @@
 import torch
 import os
+import sys
 import librosa
 from datasets import load_dataset
 from transformers import (
@@ -9,6 +10,10 @@ from transformers import (
     Seq2SeqTrainingArguments
 )
 
+# Allow running as `python trainer/main.py` from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trainer.utils.features import log_mel_features
+
 def main():
     # 1. Path to preprocessed CSV
     data_csv = "data/cleaned_audio_data.csv"
@@ -56,50 +61,57 @@ def main():
     else:
         print("CUDA not available, using CPU")
 
-    # 4. Preprocessing function
+    # 4. Preprocessing function (batched: log-mel features for the whole batch in one torch call)
     def prepare_batch(batch):
-        try:
-            # Check if audio data is loaded properly
-            if batch["file_path"] is None:
-                print(f"Error: Audio data is None for batch")
-                return None
-
-            # Load audio file
-            audio, sr = librosa.load(batch["file_path"], sr=16000)
-            if audio is None or len(audio) == 0:
-                print(f"Error: Loaded audio is empty for {batch['file_path']}")
-                return None
-
-            # Extract audio features
-            inputs = processor(audio, sampling_rate=16000, return_tensors="pt")
-
-            # Process transcription as labels using the tokenizer
+        audios = []
+        transcriptions = []
+        for file_path, transcription in zip(batch["file_path"], batch["transcription"]):
+            try:
+                # Check if audio data is loaded properly
+                if file_path is None:
+                    print(f"Error: Audio data is None for batch")
+                    continue
+
+                # Load audio file
+                audio, sr = librosa.load(file_path, sr=16000)
+                if audio is None or len(audio) == 0:
+                    print(f"Error: Loaded audio is empty for {file_path}")
+                    continue
+            except Exception as e:
+                print(f"Error in prepare_batch: {str(e)}")
+                print(f"File path: {file_path}")
+                continue
+            audios.append(audio)
             # Add special tokens for Whisper format
-            transcription_with_tokens = f"<|startoftranscript|><|es|><|transcribe|><|notimestamps|>{batch['transcription']}<|endoftext|>"
-
-            labels = processor.tokenizer(
-                transcription_with_tokens,
-                return_tensors="pt",
-                padding="max_length",
-                max_length=128,  # Set a reasonable max length
-                truncation=True
-            ).input_ids
-
-            return {
-                "input_features": inputs.input_features.squeeze(0),
-                "labels": labels.squeeze(0)
-            }
-        except Exception as e:
-            print(f"Error in prepare_batch: {str(e)}")
-            print(f"File path: {batch.get('file_path', 'Unknown')}")
-            return None
+            transcriptions.append(f"<|startoftranscript|><|es|><|transcribe|><|notimestamps|>{transcription}<|endoftext|>")
+
+        if not audios:
+            return {"input_features": [], "labels": []}
+
+        # Extract audio features
+        input_features = log_mel_features(processor, audios).input_features
+
+        # Process transcriptions as labels using the tokenizer
+        labels = processor.tokenizer(
+            transcriptions,
+            return_tensors="pt",
+            padding="max_length",
+            max_length=128,  # Set a reasonable max length
+            truncation=True
+        ).input_ids
+
+        return {
+            "input_features": list(input_features.numpy()),
+            "labels": list(labels.numpy())
+        }
 
     # 5. Map dataset and remove residual columns
     print("Starting dataset mapping...")
     train_dataset = dataset["train"].map(
         prepare_batch,
         remove_columns=["file_path", "pronunciation_label", "transcription"],
-        batched=False
+        batched=True,
+        batch_size=16
     )
 
     # 6. Configure training arguments
@@ -0,0 +1,160 @@
+import os
+import random
+import sys
+import time
+
+import librosa
+import pandas as pd
+import torch
+from transformers import WhisperProcessor, WhisperForConditionalGeneration
+from transformers.modeling_outputs import BaseModelOutput
+
+# Allow running as `python trainer/short_input_finetune.py` from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api.model.short_input import bucket_frames, short_encoder, truncate_features, clear_cache, FULL_FRAMES
+
+# Bucket size in seconds. It is saved in the checkpoint's config
+# (short_input_bucket_frames), which is where serving reads it from
+BUCKET_FRAMES = int(float(os.environ.get("ANALYZER_SHORT_INPUT_BUCKET_S", "2")) * 100)
+
+
+def load_clips(data_csv, processor, limit=None):
+    """Load (file, input_features, transcription, bucket frames) for the manifest"""
+    df = pd.read_csv(data_csv)
+    if limit:
+        df = df.head(limit)
+    clips = []
+    for _, row in df.iterrows():
+        audio_path = row['file_path']
+        if not os.path.exists(audio_path):
+            continue
+        audio, _ = librosa.load(audio_path, sr=16000)
+        features = processor(audio, sampling_rate=16000, return_tensors="pt").input_features
+        clips.append((audio_path, features, str(row['transcription']), bucket_frames(len(audio), BUCKET_FRAMES)))
+    return clips
+
+
+def finetune_short_inputs(model_path="outputs/whisper-finetuned", output_dir="outputs/whisper-finetuned-short",
+                          data_csv="data/cleaned_audio_data.csv", epochs=3, batch_size=8, learning_rate=1e-5):
+    """
+    Fine-tune a checkpoint on truncated (bucketed) encoder inputs so it
+    transcribes short clips without the 30 s of padding. Batches are drawn
+    from a single bucket so every clip in a batch has the same length.
+    """
+    print("Speech Issues Analyzer - Short Input Fine-tuning")
+    print("=" * 60)
+
+    if not os.path.exists(data_csv):
+        print(f"Error: Data file not found at {data_csv}")
+        return None
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    processor = WhisperProcessor.from_pretrained(model_path)
+    processor.tokenizer.set_prefix_tokens(language="spanish", task="transcribe")
+    model = WhisperForConditionalGeneration.from_pretrained(model_path).to(device)
+    model.train()
+
+    clips = load_clips(data_csv, processor)
+    if not clips:
+        print("No audio files found")
+        return None
+
+    buckets = {}
+    for clip in clips:
+        buckets.setdefault(clip[3], []).append(clip)
+    print(f"{len(clips)} clips in buckets: " + ", ".join(
+        f"{frames / 100:.0f}s={len(items)}" for frames, items in sorted(buckets.items())))
+
+    optimizer = torch.optim.AdamW(model.parameters(), lr=learning_rate)
+    start_token = model.config.decoder_start_token_id
+    for epoch in range(epochs):
+        batches = []
+        for frames, items in buckets.items():
+            random.shuffle(items)
+            batches.extend((frames, items[i:i + batch_size]) for i in range(0, len(items), batch_size))
+        random.shuffle(batches)
+
+        total_loss = 0.0
+        for frames, batch in batches:
+            features = torch.cat([clip[1] for clip in batch]).to(device)
+            labels = processor.tokenizer([clip[2] for clip in batch], return_tensors="pt", padding=True)
+            label_ids = labels.input_ids.masked_fill(labels.attention_mask.eq(0), -100)
+            # The model prepends the decoder start token itself
+            if (label_ids[:, 0] == start_token).all():
+                label_ids = label_ids[:, 1:]
+
+            hidden = short_encoder(model, frames)(truncate_features(features, frames)).last_hidden_state
+            loss = model(encoder_outputs=(hidden,), labels=label_ids.to(device)).loss
+            loss.backward()
+            optimizer.step()
+            optimizer.zero_grad()
+            total_loss += loss.item()
+        print(f"Epoch {epoch + 1}/{epochs}: loss {total_loss / len(batches):.4f}")
+
+    clear_cache(model)
+    model.eval()
+    # Marks the checkpoint for short-input serving (see ANALYZER_SHORT_INPUT_MODELS)
+    model.config.short_input_bucket_frames = BUCKET_FRAMES
+    model.save_pretrained(output_dir)
+    processor.save_pretrained(output_dir)
+    print(f"Saved short-input model to {output_dir}")
+    return output_dir
+
+
+def evaluate_short_inputs(model_path="outputs/whisper-finetuned-short", data_csv="data/cleaned_audio_data.csv",
+                          limit=None):
+    """
+    Compare full 30 s inputs with bucketed short inputs on the manifest:
+    exact-match accuracy against the reference and encoder time.
+    """
+    print("Speech Issues Analyzer - Short Input Evaluation")
+    print("=" * 60)
+
+    if not os.path.exists(data_csv):
+        print(f"Error: Data file not found at {data_csv}")
+        return None
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    processor = WhisperProcessor.from_pretrained(model_path)
+    model = WhisperForConditionalGeneration.from_pretrained(model_path).to(device)
+    model.eval()
+
+    generate_kwargs = {"do_sample": False, "num_beams": 1, "language": "es", "task": "transcribe"}
+    results = []
+    for audio_path, features, reference, frames in load_clips(data_csv, processor, limit):
+        features = features.to(device)
+        row = {'audio_file': os.path.basename(audio_path), 'reference': reference, 'frames': frames}
+        for mode, n_frames in (("full", FULL_FRAMES), ("short", frames)):
+            with torch.no_grad():
+                start = time.perf_counter()
+                hidden = short_encoder(model, n_frames)(truncate_features(features, n_frames)).last_hidden_state
+                encode_seconds = time.perf_counter() - start
+                ids = model.generate(encoder_outputs=BaseModelOutput(last_hidden_state=hidden), **generate_kwargs)
+            text = processor.batch_decode(ids, skip_special_tokens=True)[0].strip()
+            row[f'{mode}_transcription'] = text
+            row[f'{mode}_correct'] = text.lower() == reference.strip().lower()
+            row[f'{mode}_encode_ms'] = 1000 * encode_seconds
+        results.append(row)
+        print(f"{row['audio_file']} ({frames / 100:.0f}s bucket): encoder "
+              f"{row['full_encode_ms']:.0f} ms -> {row['short_encode_ms']:.0f} ms")
+
+    if not results:
+        print("No audio files found")
+        return None
+
+    results_df = pd.DataFrame(results)
+    print("=" * 60)
+    print(f"Accuracy full inputs:  {results_df['full_correct'].mean():.2%}")
+    print(f"Accuracy short inputs: {results_df['short_correct'].mean():.2%}")
+    print(f"Encoder speedup: {results_df['full_encode_ms'].sum() / results_df['short_encode_ms'].sum():.2f}x")
+    results_df.to_csv('short_input_results.csv', index=False)
+    print("Detailed results saved to: short_input_results.csv")
+    return results_df
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "evaluate":
+        evaluate_short_inputs()
+    else:
+        finetune_short_inputs()
+        evaluate_short_inputs()
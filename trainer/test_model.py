@@ -1,4 +1,6 @@
 import os
+import sys
+import time
 import torch
 import librosa
 import pandas as pd
@@ -6,6 +8,11 @@ from transformers import (
     WhisperProcessor,
     WhisperForConditionalGeneration
 )
+from transformers.modeling_outputs import BaseModelOutput
+
+# Allow running as `python trainer/test_model.py` from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trainer.utils.features import log_mel_features
 try:
     from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
     import seaborn as sns
@@ -26,21 +33,43 @@ def load_fine_tuned_model(model_path):
 
     return model, processor, device
 
-def transcribe_audio(audio_path, model, processor, device):
-    """Transcribe a single audio file and extract classification"""
+def load_assistant_model(assistant_path, device):
+    """Load the draft model for speculative decoding (None when not requested)"""
+    if not assistant_path:
+        return None
+    assistant_model = WhisperForConditionalGeneration.from_pretrained(assistant_path).to(device)
+    assistant_model.eval()
+    print(f"Assistant model {assistant_path} loaded for speculative decoding")
+    return assistant_model
+
+def transcribe_audio(audio_path, model, processor, device, assistant_model=None):
+    """
+    Transcribe a single audio file and extract classification
+
+    If assistant_model is given (e.g. whisper-tiny), the greedy pass uses
+    speculative decoding; the result is the same as plain greedy decoding.
+    """
     try:
         # Load audio
         audio, sr = librosa.load(audio_path, sr=16000)
 
         # Process audio
-        inputs = processor(audio, sampling_rate=16000, return_tensors="pt")
-        inputs = inputs.to(device)
+        inputs = log_mel_features(processor, [audio], device).to(device)
 
-        # Generate transcription with very simple parameters
+        # Run the encoder once; both decodes below reuse its hidden states.
+        # Assisted generation encodes for both models itself, so there the
+        # encoder only runs if the retry below needs it.
+        encoder_outputs = None
         with torch.no_grad():
+            if assistant_model is not None:
+                model_inputs = {"inputs": inputs.input_features, "assistant_model": assistant_model}
+            else:
+                encoder_outputs = model.get_encoder()(inputs.input_features, return_dict=True)
+                model_inputs = {"encoder_outputs": BaseModelOutput(last_hidden_state=encoder_outputs.last_hidden_state)}
+            # Generate transcription with very simple parameters
             # Always set language to Spanish and task to transcribe
             generated_ids = model.generate(
-                inputs.input_features,
+                **model_inputs,
                 max_length=50,
                 do_sample=False,
                 num_beams=1,
@@ -60,15 +89,19 @@ def transcribe_audio(audio_path, model, processor, device):
         # If transcription is empty, try the base model approach
         if not transcription:
             print("    Empty transcription, trying alternative approach...")
+            retry_start = time.perf_counter()
             with torch.no_grad():
+                if encoder_outputs is None:
+                    encoder_outputs = model.get_encoder()(inputs.input_features, return_dict=True)
                 generated_ids = model.generate(
-                    inputs.input_features,
+                    encoder_outputs=BaseModelOutput(last_hidden_state=encoder_outputs.last_hidden_state),
                     max_length=100,
                     language="es",
                     task="transcribe",
                 )
             transcription = processor.batch_decode(generated_ids, skip_special_tokens=True)[0].strip()
-            print(f"    Alternative transcription: '{transcription}'")
+            print(f"    Alternative transcription: '{transcription}' "
+                  f"(retry took {1000 * (time.perf_counter() - retry_start):.0f} ms, encoder reused)")
 
         # Only return the transcription, ignore any label
         return transcription.strip(), None
@@ -77,8 +110,13 @@ def transcribe_audio(audio_path, model, processor, device):
         print(f"Error transcribing {audio_path}: {str(e)}")
         return "", "normal"
 
-def test_model_effectiveness():
-    """Test the fine-tuned model on a subset of data and print both expected and predicted transcriptions"""
+def test_model_effectiveness(assistant_path=None):
+    """
+    Test the fine-tuned model on a subset of data and print both expected and predicted transcriptions
+
+    assistant_path (e.g. "openai/whisper-tiny") enables speculative decoding
+    with that model as the draft model.
+    """
 
     print("Speech Issues Analyzer - Model Testing")
     print("=" * 50)
@@ -92,6 +130,7 @@ def test_model_effectiveness():
 
     print("Loading fine-tuned model...")
     model, processor, device = load_fine_tuned_model(model_path)
+    assistant_model = load_assistant_model(assistant_path, device)
 
     # Load test data
     data_csv = "data/cleaned_audio_data.csv"
@@ -120,7 +159,7 @@ def test_model_effectiveness():
             print(f"  Warning: Audio file not found: {audio_path}")
             predicted_transcription = ""
         else:
-            predicted_transcription, _ = transcribe_audio(audio_path, model, processor, device)
+            predicted_transcription, _ = transcribe_audio(audio_path, model, processor, device, assistant_model)
 
         is_correct = predicted_transcription.strip().lower() == str(expected_transcription).strip().lower()
         if is_correct:
@@ -190,7 +229,7 @@ def test_model_effectiveness():
 
     return results_df
 
-def test_single_audio(audio_path, model_path="outputs/whisper-finetuned"):
+def test_single_audio(audio_path, model_path="outputs/whisper-finetuned", assistant_path=None):
     """Test a single audio file"""
     if not os.path.exists(audio_path):
         print(f"Error: Audio file not found: {audio_path}")
@@ -205,16 +244,17 @@ def test_single_audio(audio_path, model_path="outputs/whisper-finetuned"):
 
     # Load model
     model, processor, device = load_fine_tuned_model(model_path)
+    assistant_model = load_assistant_model(assistant_path, device)
 
     # Transcribe
-    transcription, classification = transcribe_audio(audio_path, model, processor, device)
+    transcription, classification = transcribe_audio(audio_path, model, processor, device, assistant_model)
 
     print(f"Transcription: '{transcription}'")
     print(f"Classification: {classification}")
 
 if __name__ == "__main__":
-    # Test model effectiveness
-    results_df = test_model_effectiveness()
+    # Test model effectiveness (set ASSISTANT_MODEL=openai/whisper-tiny for speculative decoding)
+    results_df = test_model_effectiveness(os.environ.get("ASSISTANT_MODEL"))
 
     # Example of testing a single file
     # test_single_audio("data/441/respuestas/agua bp.m4a")
@@ -0,0 +1,148 @@
+import time
+import weakref
+from typing import TYPE_CHECKING, Optional, Sequence
+
+import numpy as np
+
+# torch and transformers are imported when features are first extracted
+if TYPE_CHECKING:
+    import torch
+    from transformers import BatchFeature
+
+
+class LogMelExtractor:
+    """
+    Batched Whisper log-mel features in torch.
+
+    Same computation as WhisperFeatureExtractor (pad/truncate to 30 s,
+    periodic Hann window, |STFT|^2 without the last frame, mel projection,
+    log10 clamped at 1e-10, floor at max - 8 per clip, (x + 4) / 4), but
+    for the whole padded batch in one vectorized call. The window and mel
+    filterbank tensors are built once per device.
+    """
+
+    def __init__(self, feature_extractor):
+        """
+        Args:
+            feature_extractor: The processor's WhisperFeatureExtractor, whose
+                n_fft, hop length, window length and mel filters are reused
+        """
+        import torch
+        self.n_fft = feature_extractor.n_fft
+        self.hop_length = feature_extractor.hop_length
+        self.n_samples = feature_extractor.n_samples
+        self.sampling_rate = feature_extractor.sampling_rate
+        # (n_freqs, n_mels) -> (n_mels, n_freqs)
+        self._mel_filters = torch.from_numpy(np.asarray(feature_extractor.mel_filters, dtype=np.float32)).T.contiguous()
+        self._window = torch.hann_window(self.n_fft)
+        self._device_tensors = {}
+
+    def _tensors(self, device: "torch.device"):
+        """Window and filterbank on the given device (cached)"""
+        tensors = self._device_tensors.get(device)
+        if tensors is None:
+            tensors = (self._window.to(device), self._mel_filters.to(device))
+            self._device_tensors[device] = tensors
+        return tensors
+
+    def pad(self, audios: Sequence[np.ndarray], device: Optional["torch.device"] = None):
+        """
+        Zero-pad (or truncate) every clip to 30 s in one (batch, n_samples) tensor
+
+        Returns:
+            Tuple of (waveforms, attention_mask) where the mask has one entry per frame
+        """
+        import torch
+        waveforms = torch.zeros((len(audios), self.n_samples), dtype=torch.float32)
+        lengths = torch.zeros(len(audios), dtype=torch.long)
+        for i, audio in enumerate(audios):
+            audio = torch.as_tensor(np.asarray(audio, dtype=np.float32)[:self.n_samples])
+            waveforms[i, :len(audio)] = audio
+            lengths[i] = len(audio)
+        frame_starts = torch.arange(0, self.n_samples, self.hop_length)
+        attention_mask = (frame_starts[None, :] < lengths[:, None]).to(torch.int32)
+        if device is not None:
+            waveforms = waveforms.to(device)
+        return waveforms, attention_mask
+
+    def extract(self, waveforms: "torch.Tensor") -> "torch.Tensor":
+        """Log-mel spectrogram of padded waveforms, shape (batch, n_mels, frames)"""
+        import torch
+        window, mel_filters = self._tensors(waveforms.device)
+        stft = torch.stft(waveforms, self.n_fft, self.hop_length, window=window, return_complex=True)
+        magnitudes = stft[..., :-1].abs() ** 2
+        mel_spec = mel_filters @ magnitudes
+        log_spec = torch.clamp(mel_spec, min=1e-10).log10()
+        max_val = log_spec.amax(dim=(1, 2), keepdim=True)
+        log_spec = torch.maximum(log_spec, max_val - 8.0)
+        return (log_spec + 4.0) / 4.0
+
+    def __call__(self, audios: Sequence[np.ndarray], device: Optional["torch.device"] = None) -> "BatchFeature":
+        """
+        Drop-in for processor(audios, sampling_rate=16000, return_tensors="pt",
+        return_attention_mask=True) on 16 kHz waveforms
+        """
+        import torch
+        from transformers import BatchFeature
+        waveforms, attention_mask = self.pad(audios, device)
+        with torch.no_grad():
+            input_features = self.extract(waveforms)
+        return BatchFeature({"input_features": input_features, "attention_mask": attention_mask.to(input_features.device)})
+
+
+_extractors = weakref.WeakKeyDictionary()
+
+
+def get_extractor(processor) -> LogMelExtractor:
+    """LogMelExtractor for a WhisperProcessor, cached per feature extractor"""
+    feature_extractor = getattr(processor, "feature_extractor", processor)
+    extractor = _extractors.get(feature_extractor)
+    if extractor is None:
+        extractor = LogMelExtractor(feature_extractor)
+        _extractors[feature_extractor] = extractor
+    return extractor
+
+
+def log_mel_features(processor, audios: Sequence[np.ndarray],
+                     device: Optional["torch.device"] = None) -> "BatchFeature":
+    """Batched log-mel input_features and attention_mask for 16 kHz waveforms"""
+    return get_extractor(processor)(list(audios), device)
+
+
+def verify_extractor(processor, audios: Optional[Sequence[np.ndarray]] = None, atol: float = 1e-3) -> float:
+    """
+    Compare LogMelExtractor with WhisperFeatureExtractor and report the speedup
+
+    Args:
+        processor: WhisperProcessor (or WhisperFeatureExtractor)
+        audios: 16 kHz clips (defaults to random clips of 1-30 s)
+        atol: Largest accepted absolute difference
+
+    Returns:
+        The largest absolute difference between the two feature sets
+    """
+    feature_extractor = getattr(processor, "feature_extractor", processor)
+    if audios is None:
+        rng = np.random.default_rng(0)
+        audios = [0.1 * rng.standard_normal(int(seconds * 16000)).astype(np.float32)
+                  for seconds in (1, 2.5, 7, 15, 30)]
+
+    start = time.perf_counter()
+    reference = feature_extractor(list(audios), sampling_rate=16000, return_tensors="np").input_features
+    reference_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    features = log_mel_features(processor, audios).input_features.numpy()
+    batched_seconds = time.perf_counter() - start
+
+    max_diff = float(np.max(np.abs(features - reference)))
+    print(f"Log-mel features for {len(audios)} clips: max abs diff {max_diff:.2e}, "
+          f"{1000 * reference_seconds:.1f} ms -> {1000 * batched_seconds:.1f} ms")
+    if max_diff > atol:
+        raise AssertionError(f"Batched log-mel features differ from WhisperFeatureExtractor by {max_diff:.2e}")
+    return max_diff
+
+
+if __name__ == "__main__":
+    from transformers import WhisperProcessor
+
+    verify_extractor(WhisperProcessor.from_pretrained("openai/whisper-medium"))